@@ -231,14 +231,15 @@ def serial_read():
 def serial_readlines():
     """
     Reads lines from the serial port.
-    Expects: board, size
+    Expects: board, size, deadline (optional, seconds)
     """
     payload = request.get_json(force=True)
     board = get_board_from_payload(payload)
     size = int(payload.get("size", 1))
+    deadline = payload.get("deadline")
     backend.open_serial(board)
     try:
-        lines = backend.readlines_serial(board, size)
+        lines = backend.readlines_serial(board, size, None if deadline is None else float(deadline))
         return jsonify({"lines": lines})
     finally:
         backend.close_serial(board)
@@ -1,37 +1,111 @@
 # backends/local_backend.py
 from __future__ import annotations
-import os, tempfile, subprocess
+import os, errno, json, shlex, tempfile, subprocess, hashlib, contextlib, queue, threading, time
 from pathlib import Path
-from typing import Optional, Iterable, Dict, Any, Union, List
+from typing import Optional, Iterable, Dict, Any, Union, List, Callable
 
 from arduino_colab_kernel.backends.protocol import Backend
 from arduino_colab_kernel.board.board import Board
 from arduino_colab_kernel.utils.utils_cli import resolve_arduino_cli_path
+from arduino_colab_kernel.project.config import DEFAULT_BUILD_CACHE_DIR
+
+# Files arduino-cli compiles from a sketch directory (used for the rebuild check)
+SKETCH_SOURCE_SUFFIXES = frozenset({".ino", ".pde", ".c", ".cpp", ".cc", ".h", ".hpp", ".S"})
+# Build artifacts that arduino-cli upload flashes
+BUILD_ARTIFACT_SUFFIXES = frozenset({".hex", ".bin", ".elf"})
+
+# Streamed CLI output is handed to output_printer in batches (one call per interval/size)
+CLI_FLUSH_INTERVAL = 0.05  # seconds lines are collected before printing them in one call
+CLI_FLUSH_CHARS = 4096  # printed earlier once this many characters are pending
+
+# Max. seconds to wait for another kernel's build to release the shared build cache (Windows)
+CACHE_LOCK_TIMEOUT = 600
+
+# On Windows, do not allocate a console (conhost) for every arduino-cli run
+_CLI_CREATION_FLAGS = getattr(subprocess, "CREATE_NO_WINDOW", 0) if os.name == "nt" else 0
 
 # Local path to arduino-cli (can be in PATH or in the package)
 ARDUINO_CLI_PATH = os.path.abspath(
     os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools", "arduino-cli.exe")
 )
 
+@contextlib.contextmanager
+def _cache_lock(cache_dir: str):
+    """
+    Holds an exclusive cross-process lock on the build cache.
+
+    Kernels sharing the same cache directory compile one at a time, so the shared
+    core/library cache is never written concurrently.
+
+    Args:
+        cache_dir (str): Build cache directory (the lock file is <cache_dir>/.lock).
+
+    Raises:
+        RuntimeError: If the lock file cannot be created, or the lock cannot be acquired
+            (on Windows also after waiting CACHE_LOCK_TIMEOUT seconds).
+    """
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd = os.open(os.path.join(cache_dir, ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError as e:
+        raise RuntimeError(f"Failed to open build cache lock in '{cache_dir}': {e}")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError as e:
+                    # LK_LOCK gives up with EDEADLOCK after ~10 s of retries: keep waiting
+                    # (bounded); any other error will not go away by retrying
+                    if e.errno != errno.EDEADLOCK:
+                        raise RuntimeError(f"Failed to lock build cache '{cache_dir}': {e}") from e
+                    if time.monotonic() >= deadline:
+                        raise RuntimeError(
+                            f"Timed out after {CACHE_LOCK_TIMEOUT} s waiting for the build cache lock in '{cache_dir}'"
+                        ) from e
+        else:
+            import fcntl
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the descriptor releases the lock on both platforms
+        os.close(fd)
+
 class LocalBackend(Backend):
     """
     Local adapter – uses your kernel/arduino-cli and Board.serial directly.
 
     Attributes:
         _cli_path (str): Path to the arduino-cli executable.
+        build_cache_dir (str): Persistent arduino-cli build cache shared by all sketches.
+        output_printer (Optional[Callable[[str], None]]): Receives CLI output lines as they arrive.
     """
-    def __init__(self, arduino_cli: str|None = None):
+    def __init__(
+        self,
+        arduino_cli: str|None = None,
+        build_cache_dir: str = DEFAULT_BUILD_CACHE_DIR,
+        output_printer: Optional[Callable[[str], None]] = None
+    ):
         """
         Initializes the LocalBackend.
 
         Args:
             arduino_cli (str|None): Optional explicit path to arduino-cli.
+            build_cache_dir (str): Directory for the persistent build cache.
+            output_printer (Optional[Callable[[str], None]]): Optional callback for live CLI output.
 
         Raises:
             FileNotFoundError: If arduino-cli cannot be found.
         """
-        self._cli_path: str = arduino_cli if arduino_cli else self._resolve_cli()           
-        
+        self._cli_path: str = arduino_cli if arduino_cli else self._resolve_cli()
+        # (verb, fqbn, port) -> precomputed command prefix for the current CLI path
+        self._cmd_prefixes: Dict[tuple, tuple[str, ...]] = {}
+        self.build_cache_dir: str = os.path.abspath(build_cache_dir)
+        self.output_printer: Optional[Callable[[str], None]] = output_printer
+
     def set_cli_path(self, cli_path:str) -> None:
         """
         Optionally set a fixed path to arduino-cli (overrides autodetection).
@@ -40,25 +114,141 @@ class LocalBackend(Backend):
             cli_path (str): Path to arduino-cli executable.
         """
         self._cli_path = cli_path
-        
+        self._cmd_prefixes.clear()
+
+    def _cmd_prefix(self, verb: str, board: Board, with_port: bool = False) -> tuple[str, ...]:
+        """
+        Returns the cached arduino-cli command prefix for the given verb and board.
+
+        The prefix depends only on the CLI path, FQBN and (optionally) port, so it is built
+        once per combination and only the sketch directory is appended per call.
+
+        Args:
+            verb (str): arduino-cli subcommand ("compile" or "upload").
+            board (Board): The target board.
+            with_port (bool): Whether to include the "-p <port>" arguments.
+
+        Returns:
+            tuple[str, ...]: Command prefix without the sketch directory.
+        """
+        port = board.port if with_port else None
+        key = (verb, board.fqbn, port)
+        prefix = self._cmd_prefixes.get(key)
+        if prefix is None:
+            prefix = (self._cli_path, verb, "-b", board.fqbn)
+            if with_port:
+                prefix += ("-p", port)
+            self._cmd_prefixes[key] = prefix
+        return prefix
+
     def _run_cli(self, cmd: List[str]) -> subprocess.CompletedProcess:
         """
-        Runs a CLI command using subprocess.
+        Runs a CLI command, streaming its output to `output_printer` (if set).
+
+        stderr is merged into stdout so the output keeps its original order. Lines are
+        collected for up to CLI_FLUSH_INTERVAL (or CLI_FLUSH_CHARS) and passed to the
+        printer in one call, so a verbose build does not produce one display per line.
 
         Args:
             cmd (List[str]): Command and arguments as a list.
 
         Returns:
-            subprocess.CompletedProcess: The result of the subprocess run.
+            subprocess.CompletedProcess: Return code and the collected output (in stdout).
 
         Raises:
             RuntimeError: If the subprocess fails to run.
         """
+        printer = self.output_printer
+        chunks: List[str] = []
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            return result
+            with subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                text=True, bufsize=1, creationflags=_CLI_CREATION_FLAGS
+            ) as proc:
+                try:
+                    if printer:
+                        self._stream_batched(proc.stdout, chunks, printer)
+                    else:
+                        chunks.extend(proc.stdout)
+                    returncode = proc.wait()
+                except BaseException:
+                    # Also on Ctrl+C: do not leave arduino-cli running (and holding the port)
+                    proc.kill()
+                    proc.wait()
+                    raise
         except Exception as e:
             raise RuntimeError(f"Failed to run CLI command: {e}")
+        return subprocess.CompletedProcess(cmd, returncode, stdout="".join(chunks), stderr="")
+
+    @staticmethod
+    def _stream_batched(stream, chunks: List[str], printer: Callable[[str], None]) -> None:
+        """
+        Collects lines from a CLI output stream and prints them in batches.
+
+        The pipe is read by a helper thread, so pending lines are printed once the flush
+        interval passes even while the CLI is silent.
+
+        Args:
+            stream: Text stream of the CLI process (read until EOF).
+            chunks (List[str]): Receives every raw line (for the result/log).
+            printer (Callable[[str], None]): Receives the batched lines.
+        """
+        q: queue.SimpleQueue = queue.SimpleQueue()
+
+        def pump() -> None:
+            try:
+                for raw in stream:
+                    q.put(raw)
+            finally:
+                q.put(None)  # end of output
+
+        threading.Thread(target=pump, name="arduino-cli-output", daemon=True).start()
+        pending: List[str] = []
+        pending_chars = 0
+        last_flush = time.monotonic()
+        try:
+            while True:
+                try:
+                    raw = q.get(timeout=CLI_FLUSH_INTERVAL) if pending else q.get()
+                except queue.Empty:
+                    raw = ""  # interval passed without new output -> flush below
+                if raw is None:
+                    break
+                if raw:
+                    chunks.append(raw)
+                    line = raw.rstrip("\r\n")
+                    pending.append(line)
+                    pending_chars += len(line) + 1
+                if pending and (not raw or pending_chars >= CLI_FLUSH_CHARS
+                                or time.monotonic() - last_flush >= CLI_FLUSH_INTERVAL):
+                    printer("\n".join(pending))
+                    pending.clear()
+                    pending_chars = 0
+                    last_flush = time.monotonic()
+        finally:
+            if pending:
+                printer("\n".join(pending))
+
+    def _result(self, proc: subprocess.CompletedProcess) -> Dict[str, Any]:
+        """
+        Converts a finished CLI run into the backend result dictionary.
+
+        The merged output is reported as 'stdout' on success and as 'stderr' on failure.
+
+        Args:
+            proc (subprocess.CompletedProcess): Finished CLI run from _run_cli.
+
+        Returns:
+            Dict[str, Any]: Dictionary with 'status', 'cmd', 'stdout', 'stderr' and 'streamed'.
+        """
+        status = proc.returncode == 0
+        return {
+            "status": status,
+            "cmd": shlex.join(proc.args),  # formatted once, reused by the log writer
+            "stdout": proc.stdout if status else "",
+            "stderr": "" if status else proc.stdout,
+            "streamed": self.output_printer is not None,
+        }
 
     def compile(self, board: Board, sketch_source: str,
                 extra_args: Optional[Iterable[str]] = None) -> Dict[str, Any]:
@@ -71,23 +261,27 @@ class LocalBackend(Backend):
             extra_args (Optional[Iterable[str]]): Additional CLI arguments.
 
         Returns:
-            Dict[str, Any]: Dictionary with 'status', 'stdout', and 'stderr'.
+            Dict[str, Any]: Dictionary with 'status', 'cmd', 'stdout', 'stderr' and 'streamed'.
 
         Raises:
             Exception: If the compile command fails.
         """
-        cli = self._cli_path
         sketch_dir = os.path.abspath(sketch_source)
+        build_dir = self._build_dir(sketch_dir, board.fqbn)
+        try:
+            os.makedirs(build_dir, exist_ok=True)
+        except Exception as e:
+            raise RuntimeError(f"Failed to create build cache directory '{build_dir}': {e}")
         cmd = [
-            cli, "compile",
-            sketch_dir,
-            "-b", board.fqbn,
+            *self._cmd_prefix("compile", board), sketch_dir,
+            "--build-cache-path", self.build_cache_dir,
+            "--build-path", build_dir,
         ]
         if extra_args:
             cmd.extend(extra_args)
-        proc = self._run_cli(cmd)
-        status = True if proc.returncode == 0 else False
-        return {"status": status, "stdout": proc.stdout, "stderr": proc.stderr}
+        with _cache_lock(self.build_cache_dir):
+            proc = self._run_cli(cmd)
+        return self._result(proc)
 
     def upload(self, board: Board, sketch_source: str,
                extra_args: Optional[Iterable[str]] = None) -> Dict[str, Any]:
@@ -100,7 +294,7 @@ class LocalBackend(Backend):
             extra_args (Optional[Iterable[str]]): Additional CLI arguments.
 
         Returns:
-            Dict[str, Any]: Dictionary with 'status', 'stdout', and 'stderr'.
+            Dict[str, Any]: Dictionary with 'status', 'cmd', 'stdout', 'stderr' and 'streamed'.
 
         Raises:
             RuntimeError: If no serial port is set for the board.
@@ -108,19 +302,48 @@ class LocalBackend(Backend):
         """
         if board.port is None:
             raise RuntimeError("No serial port is set for the board. Use `%board serial` to set it.")
-        cli = self._cli_path
         sketch_dir = os.path.abspath(sketch_source)
-        cmd = [
-            cli, "upload",
-            sketch_dir,
-            "-p", board.port,
-            "-b", board.fqbn,
-        ]
+        cmd = [*self._cmd_prefix("upload", board, with_port=True), sketch_dir]
+        build_dir = self._build_dir(sketch_dir, board.fqbn)
+        if self._artifact_mtime(build_dir) is not None:
+            # Flash the cached artifact instead of letting arduino-cli look it up again
+            cmd.extend(["--input-dir", build_dir])
         if extra_args:
             cmd.extend(extra_args)
-        proc = self._run_cli(cmd)
-        status = True if proc.returncode == 0 else False
-        return {"status": status, "stdout": proc.stdout, "stderr": proc.stderr}
+        return self._result(self._run_cli(cmd))
+
+    def needs_rebuild(self, board: Board, sketch_source: str) -> bool:
+        """
+        Checks whether the cached build of the sketch is missing or outdated.
+
+        The build is up to date when it was made for the same FQBN and its artifact
+        is newer than every source file of the sketch.
+
+        Args:
+            board (Board): The target board.
+            sketch_source (str): Path to the sketch directory.
+
+        Returns:
+            bool: True if the sketch has to be compiled before upload.
+        """
+        sketch_dir = os.path.abspath(sketch_source)
+        build_dir = self._build_dir(sketch_dir, board.fqbn)
+        artifact_mtime = self._artifact_mtime(build_dir)
+        if artifact_mtime is None:
+            return True
+        try:
+            with open(os.path.join(build_dir, "build.options.json"), "r", encoding="utf-8") as f:
+                if json.load(f).get("fqbn") != board.fqbn:
+                    return True
+            sources = [
+                p for p in Path(sketch_dir).rglob("*")
+                if p.suffix in SKETCH_SOURCE_SUFFIXES and p.is_file()
+            ]
+            if not sources:
+                return True
+            return max(p.stat().st_mtime for p in sources) >= artifact_mtime
+        except Exception:
+            return True
 
     def open_serial(self, board: Board) -> None:
         """
@@ -173,13 +396,14 @@ class LocalBackend(Backend):
         except Exception as e:
             raise RuntimeError(f"Failed to read from serial port: {e}")
     
-    def readlines_serial(self, board: Board, size: int = 1) -> List[str]:
+    def readlines_serial(self, board: Board, size: int = 1, deadline: Optional[float] = None) -> List[str]:
         """
         Reads lines from the serial port.
 
         Args:
             board (Board): The board whose serial port to read from.
             size (int): Number of lines to read.
+            deadline (Optional[float]): Max. total time in seconds to wait (None = no limit).
 
         Returns:
             List[str]: List of lines read from the serial port.
@@ -188,7 +412,26 @@ class LocalBackend(Backend):
             Exception: If reading lines from serial fails.
         """
         try:
-            return board.serial.readlines(size)
+            return board.serial.readlines(size, deadline=deadline)
+        except Exception as e:
+            raise RuntimeError(f"Failed to read lines from serial port: {e}")
+
+    def read_available_lines(self, board: Board, prefix: Optional[Union[str, Iterable[str]]] = None) -> List[str]:
+        """
+        Reads all complete lines currently available on the serial port.
+
+        Args:
+            board (Board): The board whose serial port to read from.
+            prefix (Optional[Union[str, Iterable[str]]]): Only return lines starting with this prefix.
+
+        Returns:
+            List[str]: Lines received in one burst (may be empty).
+
+        Raises:
+            Exception: If reading from serial fails.
+        """
+        try:
+            return board.serial.read_available_lines(prefix)
         except Exception as e:
             raise RuntimeError(f"Failed to read lines from serial port: {e}")
 
@@ -214,9 +457,50 @@ class LocalBackend(Backend):
 
     # ---------- Internal helpers ----------
 
+    def _build_dir(self, sketch_dir: str, fqbn: str) -> str:
+        """
+        Returns the persistent per-sketch, per-board build directory inside the build cache.
+
+        Reusing the same build path lets arduino-cli keep object files and cached
+        library dependency detection between compiles. Each board gets its own sketch
+        artifacts, while the core cache is shared.
+
+        Args:
+            sketch_dir (str): Absolute path to the sketch directory.
+            fqbn (str): Fully qualified board name.
+
+        Returns:
+            str: Path to the build directory of the sketch.
+        """
+        key = hashlib.sha256(f"{sketch_dir}|{fqbn}".encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.build_cache_dir, "sketches", key)
+
+    @staticmethod
+    def _artifact_mtime(build_dir: str) -> Optional[float]:
+        """
+        Returns the modification time of the newest build artifact in build_dir.
+
+        Args:
+            build_dir (str): Build directory of a sketch.
+
+        Returns:
+            Optional[float]: Newest artifact mtime, or None if there is no artifact.
+        """
+        try:
+            with os.scandir(build_dir) as it:
+                mtimes = [
+                    e.stat().st_mtime for e in it
+                    if e.is_file() and os.path.splitext(e.name)[1] in BUILD_ARTIFACT_SUFFIXES
+                ]
+        except OSError:
+            return None
+        return max(mtimes) if mtimes else None
+
     def _resolve_cli(self) -> str:
         """
         Finds the path to arduino-cli – prefers explicit, then resolver/utils, finally PATH.
+        The resolver caches its result per ARDUINO_CLI/PATH value, so repeated lookups are cheap
+        and changes to the environment are still picked up.
 
         Returns:
             str: Path to arduino-cli executable.
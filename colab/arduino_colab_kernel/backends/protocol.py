@@ -10,9 +10,11 @@ class Backend(Protocol):
                 extra_args: Optional[Iterable[str]] = None) -> Dict[str, Any]: ...
     def upload(self, board: Board, sketch_source: str,
                extra_args: Optional[Iterable[str]] = None) -> Dict[str, Any]: ...
+    def needs_rebuild(self, board: Board, sketch_source: str) -> bool: ...
     # --- serial io ---
     def open_serial(self, board: Board) -> None: ...
     def close_serial(self, board: Board) -> None: ...
     def read_serial(self, board: Board, size: int = -1) -> bytes: ...
-    def readlines_serial(self, board: Board, size: int = 1) -> List[str]: ...
+    def readlines_serial(self, board: Board, size: int = 1, deadline: Optional[float] = None) -> List[str]: ...
+    def read_available_lines(self, board: Board, prefix: Optional[Union[str, Iterable[str]]] = None) -> List[str]: ...
     def write_serial(self, board: Board, data: Union[bytes, str], append_newline: bool = True) -> int: ...
\ No newline at end of file
@@ -153,6 +153,21 @@ class RemoteBackend(Backend):
         except Exception as e:
             raise RuntimeError(f"Remote upload failed: {e}")
 
+    def needs_rebuild(self, board: Board, sketch_source: str) -> bool:
+        """
+        Checks whether the sketch has to be compiled before upload.
+
+        The build cache lives on the remote server, so the sketch is always rebuilt.
+
+        Args:
+            board (Board): Board configuration.
+            sketch_source (str): Path to the sketch directory or .ino file.
+
+        Returns:
+            bool: Always True.
+        """
+        return True
+
     def open_serial(self, board: Board) -> None:
         """
         Opens the serial port on the remote server.
@@ -204,13 +219,14 @@ class RemoteBackend(Backend):
         except Exception as e:
             raise RuntimeError(f"Remote read_serial failed: {e}")
     
-    def readlines_serial(self, board: Board, size: int = 1) -> List[str]:
+    def readlines_serial(self, board: Board, size: int = 1, deadline: Optional[float] = None) -> List[str]:
         """
         Reads lines from the serial port on the remote server.
 
         Args:
             board (Board): Board configuration.
             size (int): Number of lines to read.
+            deadline (Optional[float]): Max. total time in seconds to wait (None = no limit).
 
         Returns:
             List[str]: List of lines read.
@@ -219,12 +235,34 @@ class RemoteBackend(Backend):
             Exception: If the remote call fails.
         """
         try:
-            data = self._post("/serial/readlines", {"board": board.export(), "size": size})
+            data = self._post("/serial/readlines", {"board": board.export(), "size": size, "deadline": deadline})
             lines = data.get("lines") or []
             return list(lines) if isinstance(lines, list) else []
         except Exception as e:
             raise RuntimeError(f"Remote readlines_serial failed: {e}")
 
+    def read_available_lines(self, board: Board, prefix: Optional[Union[str, Iterable[str]]] = None) -> List[str]:
+        """
+        Reads available lines from the serial port on the remote server.
+
+        The server opens the port per request, so this fetches a single line.
+
+        Args:
+            board (Board): Board configuration.
+            prefix (Optional[Union[str, Iterable[str]]]): Only return lines starting with this prefix.
+
+        Returns:
+            List[str]: List of lines read.
+
+        Raises:
+            Exception: If the remote call fails.
+        """
+        lines = self.readlines_serial(board, 1)
+        if prefix is None:
+            return lines
+        prefixes = (prefix,) if isinstance(prefix, str) else tuple(prefix)
+        return [line for line in lines if line.startswith(prefixes)]
+
     def write_serial(self, board: Board, data: Union[bytes, str], append_newline: bool = True) -> int:
         """
         Writes data to the serial port on the remote server.
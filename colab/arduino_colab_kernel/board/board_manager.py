@@ -13,12 +13,19 @@ except Exception:
     tools = None  # fallback if tools is not part of the package
     
 from arduino_colab_kernel.board.board import Board
+from arduino_colab_kernel.bridge.serial_port import SerialPort
 
 SUPPORTED_BOARDS = {
     "uno":  "arduino:avr:uno",
     "nano": "arduino:avr:nano",
 }
 
+# USB (VID, PID) pairs of the supported boards, incl. common clones; used for port autodetection
+BOARD_USB_IDS = {
+    "uno":  frozenset({(0x2341, 0x0043), (0x2341, 0x0001), (0x2341, 0x0243), (0x2A03, 0x0043), (0x1A86, 0x7523)}),
+    "nano": frozenset({(0x0403, 0x6001), (0x1A86, 0x7523), (0x2341, 0x0058)}),
+}
+
 DEFAULT_BOARD = "uno"
 
 class BoardManager:
@@ -70,7 +77,8 @@ class BoardManager:
         if key not in SUPPORTED_BOARDS:
             raise ValueError(f"Board '{name}' is not supported. Supported: {list(SUPPORTED_BOARDS.keys())}")
         try:
-            self.board = Board(name=key, fqbn=SUPPORTED_BOARDS[key])
+            port = SerialPort.suggest_port(BOARD_USB_IDS.get(key))
+            self.board = Board(name=key, fqbn=SUPPORTED_BOARDS[key], port=port)
         except Exception as e:
             raise RuntimeError(f"Failed to initialize board '{name}': {e}")
 
@@ -5,13 +5,14 @@
 #  - "remote" – HTTP/WS client (RemoteBackend)
 from __future__ import annotations
 from typing import Optional, Iterable, Dict, Any, Union, List, Callable
-import os, time
+import os, sys, time, shlex, queue, atexit, threading
 
 from arduino_colab_kernel.backends.protocol import Backend
 from arduino_colab_kernel.backends.local_backend import LocalBackend
 from arduino_colab_kernel.backends.remote_backend import RemoteBackend
 
 from arduino_colab_kernel.board.board import Board
+from arduino_colab_kernel.bridge.serial_port import as_prefix_tuple
 from arduino_colab_kernel.project.config import (
     ARDUINO_CLI_PATH,
     LOCAL_MODE,
@@ -19,6 +20,14 @@ from arduino_colab_kernel.project.config import (
     DEFAULT_REMOTE_URL
 )
 
+_DEFAULT_FILTERS = frozenset({""})  # lines ignored by listen_serial by default
+
+LOG_QUEUE_SIZE = 256  # max. pending log records before _append_log blocks
+LOG_FLUSH_INTERVAL = 0.1  # seconds the log writer waits to batch further records
+LOG_BATCH_SIZE = 32  # max. records written in one batch
+LISTEN_FLUSH_INTERVAL = 0.05  # seconds listen_serial collects lines before printing them in one call
+LISTEN_FLUSH_CHARS = 4096  # printed earlier once this many characters are pending
+
 class Bridge:
     """
     Performs operations on a specific board (Board), locally or remotely.
@@ -27,6 +36,8 @@ class Bridge:
         mode (str): Operation mode ("local" or "remote").
         _be (Backend): Backend instance (LocalBackend or RemoteBackend).
         _printer (Callable[[str], None]): Printer function for output.
+        _log_q (Optional[queue.Queue]): Pending log records (log_file, text) for the writer thread.
+        _log_thread (Optional[threading.Thread]): Background log writer, started on first log.
     """
     def __init__(
         self,
@@ -50,12 +61,20 @@ class Bridge:
         self.mode = ""
         self.remote_url = ""
         self._be: Backend
+        self._printer: Callable[[str], None] = explicit_printer if explicit_printer else print
+        self._serial_board: Optional[Board] = None  # board whose port open_serial() left open
         
         try:
             self.set_mode(mode, remote_url=remote_url, token=token)
         except ValueError as e:
             raise ValueError(f"Failed to initialize Bridge: {e}")
-        self._printer: Callable[[str], None] = explicit_printer if explicit_printer else print
+
+        # Log records are written by a background thread (see _append_log)
+        self._log_q: Optional[queue.Queue] = None
+        self._log_thread: Optional[threading.Thread] = None
+        self._log_error: Optional[str] = None
+        self._log_fds: Dict[str, int] = {}  # log_file -> fd opened with O_APPEND, reused across writes
+        self._log_lock = threading.Lock()
 
     # ---------- Wiring / configuration ----------
     def set_mode(
@@ -78,10 +97,12 @@ class Bridge:
         mode = mode.lower().strip()
         if mode not in (LOCAL_MODE, REMOTE_MODE):
             raise ValueError(f"Invalid mode '{mode}'. Use '{LOCAL_MODE}' or '{REMOTE_MODE}'.")
+        self.release_serial()  # the port belongs to the old backend
         self.mode = mode
 
         if self.mode == LOCAL_MODE:
-            self._be: Backend = LocalBackend(arduino_cli=ARDUINO_CLI_PATH)
+            # CLI output is streamed to the printer while arduino-cli runs
+            self._be: Backend = LocalBackend(arduino_cli=ARDUINO_CLI_PATH, output_printer=self._printer)
         else:  # REMOTE_MODE
             if not remote_url:
                 remote_url = DEFAULT_REMOTE_URL
@@ -114,27 +135,43 @@ class Bridge:
             ValueError: If sketch_source is not a directory.
             Exception: If backend compile fails.
         """
-        if not os.path.isdir(sketch_source):
-            raise ValueError(f"Sketch source '{sketch_source}' must be a directory!")
-        self._printer(f"💻 **Compiling for {board.name} on port {board.port or 'N/A'}...**")
-        self._printer("⏳ This may take a while, please wait...")
+        return self._compile_checked(board, self._normalize_sketch_dir(sketch_source), extra_args, log_file)
+
+    def _compile_checked(
+        self,
+        board: Board,
+        sketch_dir: str,
+        extra_args: Optional[Iterable[str]] = None,
+        log_file: Optional[str] = None
+    ) -> bool:
+        """
+        Compiles an already validated sketch directory (see compile()).
+
+        Args:
+            board (Board): The board to compile for.
+            sketch_dir (str): Absolute sketch directory returned by _normalize_sketch_dir().
+            extra_args (Optional[Iterable[str]]): Additional CLI arguments.
+            log_file (Optional[str]): Path to log file.
+
+        Returns:
+            bool: True if compilation is successful, False otherwise.
+        """
+        self._printer(
+            f"💻 **Compiling for {board.name} on port {board.port or 'N/A'}...**\n"
+            "⏳ This may take a while, please wait..."
+        )
 
         try:
-            res = self._be.compile(board, sketch_source, extra_args)
+            res = self._be.compile(board, sketch_dir, extra_args)
             ok = res.get("status", False)
-            if ok:
-                self._printer(res.get("stdout", ""))
-                self._printer("✅ **Compile complete.**")
-            else:
-                self._printer(res.get("stderr", ""))
-                self._printer("❌ **Compile failed.**")
+            self._report(res, "✅ **Compile complete.**" if ok else "❌ **Compile failed.**")
             if log_file and isinstance(log_file, str):
                 self._append_log(
                     log_file,
-                    res.get("cmd", []),
+                    res.get("cmd", ""),
                     res.get("stdout", ""),
                     res.get("stderr", ""),
-                    res.get("ok", False)
+                    ok
                 )
             return ok
         except Exception as e:
@@ -163,50 +200,76 @@ class Bridge:
             ValueError: If sketch_source is not a directory.
             Exception: If backend upload fails.
         """
-        if not os.path.isdir(sketch_source):
-            raise ValueError(f"Sketch source '{sketch_source}' must be a directory!")
-        self._printer(f"📡 **Uploading to {board.name} on port {board.port or 'N/A'}...**")
-        self._printer("⏳ This may take a while, please wait...")
+        sketch_dir = self._normalize_sketch_dir(sketch_source)
+        # The uploader needs the port; a handle kept open between %%serial cells would block it
+        self.release_serial()
         try:
-            # First compile, then upload if successful
-            if not self.compile(board, sketch_source, log_file=log_file, extra_args=extra_args):
+            # First compile (unless the cached build is up to date), then upload if successful
+            rebuild = self._be.needs_rebuild(board, sketch_dir)
+            header = [
+                f"📡 **Uploading to {board.name} on port {board.port or 'N/A'}...**",
+                "⏳ This may take a while, please wait...",
+            ]
+            if not rebuild:
+                header.append("♻️ Sketch unchanged, uploading the cached build.")
+            self._printer("\n".join(header))
+            if rebuild and not self._compile_checked(board, sketch_dir, log_file=log_file, extra_args=extra_args):
                 self._printer("❌ **Compilation failed, upload aborted.**")
                 return False
 
-            res = self._be.upload(board, sketch_source, extra_args)
+            res = self._be.upload(board, sketch_dir, extra_args)
             ok = res.get("status", False)
-            if ok:
-                self._printer(res.get("stdout", ""))
-                self._printer("✅ **Upload complete.**")
-            else:
-                self._printer(res.get("stderr", ""))
-                self._printer("❌ **Upload failed.**")
+            self._report(res, "✅ **Upload complete.**" if ok else "❌ **Upload failed.**")
             if log_file and isinstance(log_file, str):
                 self._append_log(
                     log_file,
-                    res.get("cmd", []),
+                    res.get("cmd", ""),
                     res.get("stdout", ""),
                     res.get("stderr", ""),
-                    res.get("ok", False)
+                    ok
                 )
             return ok
         except Exception as e:
             raise e
 
+    @staticmethod
+    def _normalize_sketch_dir(sketch_source: str) -> str:
+        """
+        Validates the sketch directory once per public call.
+
+        Args:
+            sketch_source (str): Path to the sketch directory.
+
+        Returns:
+            str: Absolute path of the sketch directory.
+
+        Raises:
+            ValueError: If sketch_source is not a directory.
+        """
+        if not os.path.isdir(sketch_source):
+            raise ValueError(f"Sketch source '{sketch_source}' must be a directory!")
+        return os.path.abspath(sketch_source)
+
     def open_serial(self, board: Board) -> None:
         """
         Opens the serial port for the given board.
 
+        The port stays open until close_serial()/release_serial(), an upload, or until
+        another board's port is opened; opening an already open port is cheap.
+
         Args:
             board (Board): The board whose serial port to open.
 
         Raises:
             Exception: If opening the serial port fails.
         """
+        if self._serial_board is not None and self._serial_board is not board:
+            self.release_serial()
         try:
             self._be.open_serial(board)
         except Exception as e:
             raise RuntimeError(f"Failed to open serial port: {e}")
+        self._serial_board = board
 
     def close_serial(self, board: Board) -> None:
         """
@@ -218,11 +281,28 @@ class Bridge:
         Raises:
             Exception: If closing the serial port fails.
         """
+        if self._serial_board is board:
+            self._serial_board = None
         try:
             self._be.close_serial(board)
         except Exception as e:
             raise RuntimeError(f"Failed to close serial port: {e}")
 
+    def release_serial(self) -> None:
+        """
+        Closes the serial port left open by open_serial(), if any.
+
+        Errors are ignored: the handle is dropped either way and the caller
+        (upload, mode switch, shutdown) must not fail because of it.
+        """
+        board, self._serial_board = self._serial_board, None
+        if board is None:
+            return
+        try:
+            self._be.close_serial(board)
+        except Exception:
+            pass
+
     def read_serial(self, board: Board, size: int = 1024) -> bytes:
         """
         Reads bytes from the serial port.
@@ -242,13 +322,14 @@ class Bridge:
         except Exception as e:
             raise RuntimeError(f"Failed to read from serial port: {e}")
 
-    def readlines_serial(self, board: Board, size: int = 1) -> List[str]:
+    def readlines_serial(self, board: Board, size: int = 1, deadline: Optional[float] = None) -> List[str]:
         """
         Reads lines from the serial port.
 
         Args:
             board (Board): The board whose serial port to read from.
             size (int): Number of lines to read.
+            deadline (Optional[float]): Max. total time in seconds to wait (None = no limit).
 
         Returns:
             List[str]: List of lines read from the serial port.
@@ -257,7 +338,7 @@ class Bridge:
             Exception: If reading lines from serial fails.
         """
         try:
-            return self._be.readlines_serial(board, size)
+            return self._be.readlines_serial(board, size, deadline)
         except Exception as e:
             raise RuntimeError(f"Failed to read lines from serial port: {e}")
 
@@ -285,69 +366,220 @@ class Bridge:
         self,
         board: Board,
         duration: Optional[int] = None,
-        prefix: Optional[str] = None,
-        filters: List[str] = [""]
+        prefix: Optional[Union[str, Iterable[str]]] = None,
+        filters: Optional[Iterable[str]] = None
     ) -> None:
         """
         Listens to the serial port and prints lines, optionally filtering by prefix and duration.
 
+        Lines are collected for up to LISTEN_FLUSH_INTERVAL (or LISTEN_FLUSH_CHARS) and
+        printed with one printer call, so a chatty sketch does not cost one output
+        message per line; pending lines are printed when listening ends.
+
         Args:
             board (Board): The board whose serial port to listen to.
             duration (Optional[int]): Duration in seconds to listen (None for unlimited).
-            prefix (Optional[str]): Only print lines starting with this prefix.
-            filters (List[str]): List of lines to ignore.
+            prefix (Optional[Union[str, Iterable[str]]]): Only print lines starting with this prefix
+                (or with any of the given prefixes).
+            filters (Optional[Iterable[str]]): Lines to ignore (default: empty lines).
 
         Raises:
             Exception: If listening fails.
         """
-        start = time.time()
+        filters = _DEFAULT_FILTERS if filters is None else frozenset(filters)
+        prefixes = as_prefix_tuple(prefix)
+        pending: List[str] = []
+        pending_chars = 0
+        start = last_flush = time.monotonic()
         try:
             while True:
-                if duration is not None and (time.time() - start) >= duration:
+                now = time.monotonic()
+                if duration is not None and (now - start) >= duration:
                     break
-                lines = self.readlines_serial(board, size=1)
-                line = lines[0] if lines else None
-                if line is None or line in filters:
-                    continue
-                if prefix is not None and not line.startswith(prefix):
-                    continue
-                self._printer(line)
+                # Prefix matching happens in the backend, before lines are decoded
+                for line in self._be.read_available_lines(board, prefixes or None):
+                    if line in filters:
+                        continue
+                    pending.append(line)
+                    pending_chars += len(line) + 1
+                if pending and (pending_chars >= LISTEN_FLUSH_CHARS or time.monotonic() - last_flush >= LISTEN_FLUSH_INTERVAL):
+                    self._printer("\n".join(pending))
+                    pending.clear()
+                    pending_chars = 0
+                    last_flush = time.monotonic()
         except KeyboardInterrupt:
             pass
         except Exception as e:
             raise RuntimeError(f"Error during serial listen: {e}")
+        finally:
+            if pending:
+                self._printer("\n".join(pending))
+
+    def _report(self, res: Dict[str, Any], status: str) -> None:
+        """
+        Prints the CLI output (unless it was already streamed) and the status line in one call.
+
+        Args:
+            res (Dict[str, Any]): Backend result of compile/upload.
+            status (str): Status line printed after the output.
+        """
+        text = "" if res.get("streamed") else res.get("stdout" if res.get("status") else "stderr", "")
+        self._write_output(f"{text.rstrip()}\n{status}" if text else status)
+
+    def _write_output(self, text: Optional[str]) -> None:
+        """
+        Writes raw CLI output in one go.
+
+        With the default printer the text is written directly to stdout with a single
+        write + flush instead of going through print(); a custom printer gets the whole
+        text in one call. Empty output is skipped.
+
+        Args:
+            text (Optional[str]): Output text (stdout or stderr of the CLI).
+        """
+        if not text:
+            return
+        if self._printer is print:
+            sys.stdout.write(text if text.endswith("\n") else text + "\n")
+            sys.stdout.flush()
+        else:
+            self._printer(text)
+
+    def flush_logs(self) -> None:
+        """
+        Waits until all queued log records are written to disk.
+
+        Raises:
+            RuntimeError: If the background writer failed to write a log record.
+        """
+        if self._log_q is not None:
+            self._log_q.join()
+        if self._log_error:
+            err, self._log_error = self._log_error, None
+            raise RuntimeError(err)
 
-    @staticmethod
     def _append_log(
+        self,
         log_file: str,
-        cmd: list[str],
+        cmd: Union[str, List[str]],
         stdout: str,
         stderr: str,
         ok: bool
     ) -> None:
         """
-        Appends a run record to the log file.
+        Queues a run record for the log file.
+
+        The record is formatted here and written by a background thread, so disk I/O
+        does not delay returning from compile/upload. Use flush_logs() to wait for it.
 
         Args:
             log_file (str): Path to log file.
-            cmd (list[str]): Command executed.
+            cmd (Union[str, List[str]]): Command executed (preformatted string or argument list).
             stdout (str): Standard output.
             stderr (str): Standard error.
             ok (bool): Whether the command succeeded.
+        """
+        cmd_str = cmd if isinstance(cmd, str) else shlex.join(cmd)
+        parts = ["\n" + "=" * 80 + "\n", ("OK" if ok else "FAIL") + " | " + cmd_str + "\n"]
+        if stdout:
+            parts.append("\n[STDOUT]\n" + stdout.strip() + "\n")
+        if stderr:
+            parts.append("\n[STDERR]\n" + stderr.strip() + "\n")
+        if self._log_thread is None:
+            self._log_q = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+            self._log_thread = threading.Thread(target=self._log_drain, name="bridge-log-writer", daemon=True)
+            self._log_thread.start()
+            atexit.register(self.close_logs)  # do not lose queued records on interpreter exit
+        self._log_q.put((log_file, "".join(parts)))
+
+    def _log_drain(self) -> None:
+        """
+        Background loop of the log writer thread.
+
+        Collects records for up to LOG_FLUSH_INTERVAL seconds (or LOG_BATCH_SIZE records)
+        and writes them grouped per log file.
+        """
+        q = self._log_q
+        while True:
+            batch = [q.get()]
+            deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+            while len(batch) < LOG_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(q.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            grouped: Dict[str, List[str]] = {}
+            for log_file, text in batch:
+                grouped.setdefault(log_file, []).append(text)
+            for log_file, texts in grouped.items():
+                try:
+                    with self._log_lock:
+                        self._write_log(log_file, "".join(texts).encode("utf-8"))
+                except Exception as e:
+                    self._log_error = f"Failed to write to log file '{log_file}': {e}"
+            for _ in batch:
+                q.task_done()
+
+    def _write_log(self, log_file: str, data: bytes) -> None:
+        """
+        Appends data to a log file through a cached O_APPEND file descriptor.
+
+        The directory is created and the file opened only on the first write; later
+        records are written with a single os.write call.
+
+        Args:
+            log_file (str): Path to log file.
+            data (bytes): Encoded log records.
 
         Raises:
-            Exception: If log file cannot be written.
+            OSError: If the file cannot be opened or written.
         """
-        try:
+        fd = self._log_fds.get(log_file)
+        if fd is None:
             os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
-            with open(log_file, "a", encoding="utf-8") as f:
-                f.write("\n" + "=" * 80 + "\n")
-                f.write(("OK" if ok else "FAIL") + " | " + " ".join(cmd) + "\n")
-                if stdout:
-                    f.write("\n[STDOUT]\n" + stdout.strip() + "\n")
-                if stderr:
-                    f.write("\n[STDERR]\n" + stderr.strip() + "\n")
-        except Exception as e:
-            raise RuntimeError(f"Failed to write to log file '{log_file}': {e}")
+            fd = os.open(log_file, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            self._log_fds[log_file] = fd
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+
+    def close_logs(self) -> None:
+        """
+        Writes all queued log records and closes the cached log file descriptors.
+
+        Call before deleting or moving a directory containing log files.
+        """
+        if self._log_q is not None:
+            self._log_q.join()
+        with self._log_lock:
+            fds, self._log_fds = self._log_fds, {}
+        for fd in fds.values():
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+def __getattr__(name: str) -> Any:
+    """
+    Lazily creates the global Bridge manager on first access (PEP 562).
+
+    Importing this module no longer constructs a LocalBackend (and resolves arduino-cli)
+    unless `bridge_manager` is actually used.
+
+    Args:
+        name (str): Attribute name requested from the module.
 
-bridge_manager = Bridge(mode=LOCAL_MODE)  # Global instance of the Bridge manager
\ No newline at end of file
+    Returns:
+        Any: The global Bridge instance for "bridge_manager".
+
+    Raises:
+        AttributeError: If the attribute does not exist.
+    """
+    if name == "bridge_manager":
+        manager = Bridge(mode=LOCAL_MODE)  # Global instance of the Bridge manager
+        globals()["bridge_manager"] = manager
+        return manager
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -3,7 +3,9 @@
 # Dependency: pyserial (pip install pyserial)
 
 from __future__ import annotations
-from typing import Optional, Union, Callable
+from typing import Optional, Union, Callable, Iterable
+import os
+import re
 import time
 
 try:
@@ -15,10 +17,69 @@ except Exception as e:
     ) from e
 
 
-SAFETY_TIMEOUT = 0.1  # seconds
+SAFETY_TIMEOUT = 0.1  # seconds, pause between polls when the port has no read timeout
 WATCHDOG_RESET_INTERVAL = 10.0  # seconds
+LISTEN_POLL_INTERVAL = 0.5  # seconds, max. blocking read while listening (bounds Ctrl+C / duration latency)
+_EMPTY_RAW_LINES = frozenset({b"", b"\n", b"\r\n"})  # raw lines skipped by readline()
+_EMPTY_LINES = frozenset({"", "\n", "\r\n"})  # decoded lines skipped by readlines()
+
+PORTS_CACHE_TTL = 2.0  # seconds, how long a port enumeration is reused
+# USB vendor IDs of Arduino boards and of USB-serial chips common on clones (CH340, FTDI, CP210x)
+ARDUINO_USB_VIDS = frozenset({0x2341, 0x2A03, 0x1A86, 0x0403, 0x10C4})
+# Ports never picked by autodetection: Bluetooth nodes and macOS /dev/cu.* or /dev/tty.* devices other than USB ones
+_NON_BOARD_PORT_RE = re.compile(r"bluetooth|^/dev/(?:cu|tty)\.(?!usb|serial|wch)", re.IGNORECASE)
+
+_ports_cache: tuple[float, list] = (0.0, [])  # (monotonic timestamp, comports() result)
+
+# USB-serial latency: FTDI-style drivers hold short packets up to `latency_timer` ms (default 16)
+LATENCY_TIMER_MS = 1
+WIN_RX_BUFFER_SIZE = 65536  # bytes, driver receive buffer requested on Windows (default is ~4 KiB)
+WIN_TX_BUFFER_SIZE = 8192
+_latency_tuned: set[str] = set()  # tty names whose sysfs latency_timer was already handled
 
 # ---------- Port autodetection ----------
+def _comports_cached(ttl: float = PORTS_CACHE_TTL) -> list:
+    """
+    Returns list_ports.comports(), reusing the previous result for `ttl` seconds.
+
+    Enumerating ports walks the registry/sysfs, which is slow on some systems. Ports
+    are ordered once per enumeration: known Arduino/USB-serial VIDs first, then other
+    USB ports, then the rest.
+
+    Args:
+        ttl (float): Maximum age of a cached enumeration in seconds.
+
+    Returns:
+        list: List of pyserial ListPortInfo objects.
+    """
+    global _ports_cache
+    ts, ports = _ports_cache
+    now = time.monotonic()
+    if ts == 0.0 or now - ts >= ttl:
+        ports = sorted(list_ports.comports(), key=_port_rank)
+        _ports_cache = (now, ports)
+    return ports
+
+def _port_rank(p) -> int:
+    """
+    Sort key for enumerated ports (lower = more likely an Arduino).
+
+    Args:
+        p: pyserial ListPortInfo.
+
+    Returns:
+        int: 0 for a known VID, 1 for another USB port, 2 otherwise, 3 for Bluetooth-like ports.
+    """
+    if p.vid in ARDUINO_USB_VIDS:
+        return 0
+    device = p.device or ""
+    if _NON_BOARD_PORT_RE.search(device):
+        return 3
+    name = device.lower()
+    if p.vid is not None or "usb" in name or "acm" in name:
+        return 1
+    return 2
+
 def list_serial_ports() -> list[str]:
     """
     Returns a list of available serial ports (e.g. COM3, /dev/ttyUSB0).
@@ -26,7 +87,23 @@ def list_serial_ports() -> list[str]:
     Returns:
         list[str]: List of serial port device names.
     """
-    return [p.device for p in list_ports.comports()]
+    return [p.device for p in _comports_cached()]
+
+def as_prefix_tuple(prefix: Optional[Union[str, Iterable[str]]]) -> tuple[str, ...]:
+    """
+    Normalizes a prefix filter into a tuple usable by str.startswith.
+
+    Args:
+        prefix (Optional[Union[str, Iterable[str]]]): Single prefix, several prefixes or None.
+
+    Returns:
+        tuple[str, ...]: Tuple of prefixes (empty if no filtering is requested).
+    """
+    if prefix is None:
+        return ()
+    if isinstance(prefix, str):
+        return (prefix,)
+    return tuple(prefix)
 
 class SerialPort:
     """
@@ -69,9 +146,12 @@ class SerialPort:
         self.timeout = timeout
         self.encoding = encoding
         self.autostrip = autostrip
+        self._newline: bytes = "\n".encode(encoding)  # pre-encoded line terminator for write()
 
         # Internal handle
         self._ser: Optional[serial.Serial] = None
+        # Received bytes not yet returned as complete lines (see read_available_lines)
+        self._rxbuf = bytearray()
 
     # ---------- Configuration ----------
 
@@ -101,8 +181,12 @@ class SerialPort:
             self.timeout = timeout
         if encoding is not None:
             self.encoding = encoding
+            self._newline = "\n".encode(encoding)
         if autostrip is not None:
             self.autostrip = autostrip
+        # An open handle keeps its old settings; close it so the next open() applies the new ones
+        if self._ser is not None and (port, baudrate, timeout) != (None, None, None):
+            self.close()
             
     def export(self) -> dict:
         """
@@ -139,8 +223,39 @@ class SerialPort:
                 timeout=self.timeout,
                 write_timeout=self.timeout,
             )
+            self._rxbuf = bytearray()
         except Exception as e:
             raise RuntimeError(f"Failed to open serial port '{self.port}': {e}")
+        self._tune_latency()
+
+    def _tune_latency(self) -> None:
+        """
+        Best-effort reduction of USB-serial latency after open (unsupported steps are skipped).
+
+        - Linux: sets ASYNC_LOW_LATENCY on the tty and, once per device, lowers the
+          usb-serial `latency_timer` in sysfs (only possible if the node is writable).
+        - Windows: enlarges the driver buffers so bursts at high baud rates do not overflow.
+        """
+        ser = self._ser
+        if hasattr(ser, "set_low_latency_mode"):  # Linux only
+            try:
+                ser.set_low_latency_mode(True)
+            except Exception:
+                pass
+        if hasattr(ser, "set_buffer_size"):  # Windows only
+            try:
+                ser.set_buffer_size(rx_size=WIN_RX_BUFFER_SIZE, tx_size=WIN_TX_BUFFER_SIZE)
+            except Exception:
+                pass
+        name = os.path.basename(self.port or "")
+        if not name.startswith("ttyUSB") or name in _latency_tuned:
+            return
+        _latency_tuned.add(name)
+        try:
+            with open(f"/sys/bus/usb-serial/devices/{name}/latency_timer", "w") as f:
+                f.write(str(LATENCY_TIMER_MS))
+        except OSError:
+            pass  # no such node (not FTDI-like) or not writable without root
 
     def close(self) -> None:
         """
@@ -156,6 +271,7 @@ class SerialPort:
             raise RuntimeError(f"Failed to close serial port: {e}")
         finally:
             self._ser = None
+            self._rxbuf = bytearray()
 
     # ---------- I/O ----------
 
@@ -178,10 +294,15 @@ class SerialPort:
         except Exception as e:
             raise RuntimeError(f"Failed to read line from serial port: {e}")
 
-    def readline(self, filters=[b"", b"\n", b"\r\n"]) -> str:
+    def readline(self, filters=_EMPTY_RAW_LINES, until: Optional[float] = None) -> str:
         """
         Reads one line (non-blocking according to timeout).
 
+        Args:
+            filters: Raw lines to skip while waiting.
+            until (Optional[float]): time.monotonic() value after which None is returned
+                instead of waiting further.
+
         Returns:
             Optional[str]: The line read, or None if nothing is read.
 
@@ -190,31 +311,161 @@ class SerialPort:
         """
         if not self._ser or not self._ser.is_open:
             raise RuntimeError("Serial port is not open. Call open() first.")
-        watchdog = 0
-        
+        # pyserial's readline() already blocks up to `timeout`, so no extra sleep is needed
+        # (only a zero/None timeout would spin, hence the fallback pause)
+        pause = 0 if self.timeout else SAFETY_TIMEOUT
+        deadline = time.monotonic() + WATCHDOG_RESET_INTERVAL
         try:
-            raw = None
-            while raw is None or raw in filters:
-                raw = self.read()
-                time.sleep(SAFETY_TIMEOUT)  # gentle pause to avoid CPU spinning
-                watchdog += SAFETY_TIMEOUT
-                if watchdog >= WATCHDOG_RESET_INTERVAL:
+            raw = self._readline_raw()
+            while raw in filters:
+                if until is not None and time.monotonic() >= until:
+                    return None
+                if time.monotonic() >= deadline:
                     raise RuntimeError("Watchdog: No data received from serial port for too long.")
+                if pause:
+                    time.sleep(pause)
+                raw = self._readline_raw()
         except Exception as e:
             raise RuntimeError(f"Failed to read line from serial port: {e}")
         
+        return self._decode(raw)
+
+    def _readline_raw(self) -> bytes:
+        """
+        Returns the next raw line from the receive buffer, refilling it in chunks.
+
+        pyserial's readline() reads one byte per call (one syscall per byte, and far
+        slower on Windows); here each read takes everything the driver has buffered
+        (`in_waiting`, at least 1 byte) and later lines are served from the buffer.
+        Like readline(), it gives up after `timeout` and returns the partial line.
+
+        Returns:
+            bytes: Raw line (possibly incomplete if the read timed out).
+        """
+        buf = self._rxbuf
+        i = buf.find(b"\n")
+        if i == -1:
+            ser = self._ser
+            end = time.monotonic() + self.timeout if self.timeout is not None else None
+            while True:
+                chunk = ser.read(ser.in_waiting or 1)  # waits up to `timeout` for the first byte
+                if not chunk:
+                    break
+                start = len(buf)
+                buf += chunk
+                i = buf.find(b"\n", start)
+                if i != -1 or (end is not None and time.monotonic() >= end):
+                    break
+            if i == -1:
+                raw = bytes(buf)
+                buf.clear()
+                return raw
+        raw = bytes(buf[:i + 1])
+        del buf[:i + 1]
+        return raw
+
+    def read_available_lines(self, prefix: Optional[Union[str, Iterable[str]]] = None) -> list[str]:
+        """
+        Reads whatever the port has buffered and returns all complete lines.
+
+        One read call fetches the whole burst (waiting up to `timeout` for the first
+        byte); a trailing partial line is kept for the next call. Empty lines are skipped.
+
+        Args:
+            prefix (Optional[Union[str, Iterable[str]]]): Only return lines starting with
+                this prefix (or any of the given prefixes). Matching is done on the raw
+                bytes, so skipped lines are never decoded.
+
+        Returns:
+            list[str]: Complete decoded lines (without the newline), possibly empty.
+
+        Raises:
+            RuntimeError: If the port is not open or reading fails.
+        """
+        return self._read_lines(self._encode_prefixes(as_prefix_tuple(prefix)))
+
+    def _encode_prefixes(self, prefixes: tuple[str, ...]) -> tuple[bytes, ...]:
+        """
+        Encodes prefix filters with the port encoding for matching raw lines.
+
+        Args:
+            prefixes (tuple[str, ...]): Prefixes as returned by as_prefix_tuple().
+
+        Returns:
+            tuple[bytes, ...]: Encoded prefixes (empty tuple = no filtering).
+        """
+        return tuple(p.encode(self.encoding, errors="replace") for p in prefixes)
+
+    def _read_lines(self, raw_prefixes: tuple[bytes, ...] = ()) -> list[str]:
+        """
+        Implementation of read_available_lines() with pre-encoded prefixes.
+
+        Args:
+            raw_prefixes (tuple[bytes, ...]): Encoded prefixes (empty tuple = no filtering).
+
+        Returns:
+            list[str]: Complete decoded lines that passed the prefix filter.
+
+        Raises:
+            RuntimeError: If the port is not open or reading fails.
+        """
+        if not self._ser or not self._ser.is_open:
+            raise RuntimeError("Serial port is not open. Call open() first.")
+        buf = self._rxbuf
+        try:
+            ser = self._ser
+            waiting = ser.in_waiting
+            # Do not block for new data while complete lines are already buffered
+            if waiting or b"\n" not in buf:
+                buf += ser.read(waiting or 1)
+        except Exception as e:
+            raise RuntimeError(f"Failed to read from serial port: {e}")
+        # Search the whole buffer, not just the new chunk: _readline_raw() may have
+        # left complete lines behind
+        i = buf.find(b"\n")
+        if i == -1:
+            return []
+        # Scan line boundaries in place: only matching lines are sliced and decoded,
+        # and the trailing partial line stays in the same buffer
+        out: list[str] = []
+        start = 0
+        with memoryview(buf) as mv:
+            while i != -1:
+                if raw_prefixes:
+                    keep = buf.startswith(raw_prefixes, start, i)
+                else:
+                    keep = i > start and not (i - start == 1 and buf[start] == 0x0D)
+                if keep:
+                    out.append(self._decode(mv[start:i]))
+                start = i + 1
+                i = buf.find(b"\n", start)
+        del buf[:start]
+        return out
+
+    def _decode(self, raw: Union[bytes, memoryview]) -> str:
+        """
+        Decodes a raw line according to the configured encoding and autostrip.
+
+        Args:
+            raw (Union[bytes, memoryview]): Raw line as read from the port.
+
+        Returns:
+            str: Decoded line.
+        """
         try:
-            txt = raw.decode(self.encoding, errors="replace")
+            txt = str(raw, self.encoding, "replace")
         except Exception:
-            txt = raw.decode("latin-1", errors="replace")
+            txt = str(raw, "latin-1", "replace")
         return txt.rstrip("\r\n") if self.autostrip else txt
 
-    def readlines(self, lines: int = 1, filters=["", "\n", "\r\n"]) -> list[str]:
+    def readlines(self, lines: int = 1, filters=_EMPTY_LINES, deadline: Optional[float] = None) -> list[str]:
         """
         Reads N lines (non-blocking loop – waits within timeouts).
 
         Args:
             lines (int): Number of lines to read.
+            deadline (Optional[float]): Max. total time in seconds to wait; fewer lines
+                are returned when it expires (None = wait until N lines arrive).
 
         Returns:
             list[str]: List of lines read.
@@ -224,33 +475,42 @@ class SerialPort:
         """
         if lines < 1:
             lines = 1
+        end = None if deadline is None else time.monotonic() + deadline
         out: list[str] = []
-        while len(out) < lines:
-            line = self.readline()
+        while len(out) < lines and (end is None or time.monotonic() < end):
+            line = self.readline(until=end)
             if line is None or line in filters:
                 continue
             out.append(line)
         return out
 
-    def write(self, data: Union[bytes, str], append_newline: bool = True) -> int:
+    def write(self, data: Union[bytes, bytearray, memoryview, str], append_newline: bool = True) -> int:
         """
         Writes data to the port (optionally with trailing newline).
 
+        Binary data is written as-is in one call (no copy, no newline); text is encoded
+        once with the configured encoding.
+
         Args:
-            data (str): Data to write.
-            append_newline (bool): Whether to append a newline.
+            data (Union[bytes, bytearray, memoryview, str]): Data to write.
+            append_newline (bool): Whether to append a newline (text only).
+
+        Returns:
+            int: Number of bytes written.
 
         Raises:
             RuntimeError: If serial port is not open or writing fails.
-             ValueError: If data is not bytes or str.
+            ValueError: If data is not bytes-like or str.
         """
         if not self._ser or not self._ser.is_open:
             raise RuntimeError("Serial port is not open. Call open() first.")
         try:
-            if isinstance(data, bytes):
+            if isinstance(data, (bytes, bytearray, memoryview)):
                 payload = data
-            elif isinstance(data, str):    
-                payload = (data + ("\n" if append_newline else "")).encode(self.encoding, errors="ignore")
+            elif isinstance(data, str):
+                payload = data.encode(self.encoding, errors="ignore")
+                if append_newline:
+                    payload += self._newline
             else:
                 raise ValueError("Data must be bytes or str.")
             ret = self._ser.write(payload)
@@ -261,51 +521,75 @@ class SerialPort:
     def listen(
         self,
         duration: Optional[float] = None,
-        prefix: Optional[str] = None,
+        prefix: Optional[Union[str, Iterable[str]]] = None,
         printer: Callable[[str], None] = print,
     ) -> None:
         """
         Streams lines for `duration` seconds (None = until Ctrl+C). Optionally filters by prefix.
 
+        Reads block in the serial driver (up to LISTEN_POLL_INTERVAL), so an idle device
+        does not keep the kernel busy and the watchdog of readline() does not apply.
+
         Args:
             duration (Optional[float]): Duration in seconds to listen, or None for unlimited.
-            prefix (Optional[str]): Only print lines starting with this prefix.
+            prefix (Optional[Union[str, Iterable[str]]]): Only print lines starting with this prefix
+                (or with any of the given prefixes).
             printer (Callable[[str], None]): Function to call for each line.
 
         Raises:
-            Exception: If reading from serial fails.
+            RuntimeError: If the port is not open or reading from serial fails.
         """
-        start = time.time()
+        if not self._ser or not self._ser.is_open:
+            raise RuntimeError("Serial port is not open. Call open() first.")
+        # Prefixes are encoded once and matched on raw bytes before decoding
+        raw_prefixes = self._encode_prefixes(as_prefix_tuple(prefix))
+        end = None if duration is None else time.monotonic() + duration
+        # Block in the driver while the device is idle instead of polling from Python;
+        # the interval only bounds how late the duration/Ctrl+C check can come.
+        original_timeout = self._ser.timeout
+        self._ser.timeout = LISTEN_POLL_INTERVAL
         try:
-            while True:
-                if duration is not None and (time.time() - start) >= duration:
-                    break
-                line = self.readline()
-                if line is None:
-                    continue
-                if prefix is not None and not line.startswith(prefix):
-                    continue
-                printer(line)
+            while end is None or time.monotonic() < end:
+                for line in self._read_lines(raw_prefixes):
+                    printer(line)
         except KeyboardInterrupt:
             pass
         except Exception as e:
             raise RuntimeError(f"Error during serial listen: {e}")
+        finally:
+            try:
+                self._ser.timeout = original_timeout
+            except Exception:
+                pass
 
     # ---------- Utility ----------
 
     @staticmethod
-    def suggest_port() -> Optional[str]:
+    def invalidate_port_cache() -> None:
+        """
+        Drops the cached port enumeration (e.g. after plugging in a device).
+        """
+        global _ports_cache
+        _ports_cache = (0.0, [])
+
+    @staticmethod
+    def suggest_port(usb_ids: Optional[Iterable[tuple[int, int]]] = None) -> Optional[str]:
         """
         Heuristically selects a suitable port (if available).
 
+        Args:
+            usb_ids (Optional[Iterable[tuple[int, int]]]): (VID, PID) pairs of the expected board;
+                a port matching one of them is returned right away.
+
         Returns:
             Optional[str]: Device name of a suitable port, or None if none found.
         """
-        ports = list(list_ports.comports())
-        if not ports:
-            return None
-        for p in ports:
-            name = (p.device or "").lower()
-            if "usb" in name or "acm" in name:
-                return p.device
-        return ports[0].device
+        ports = _comports_cached()
+        if usb_ids:
+            for p in ports:
+                if (p.vid, p.pid) in usb_ids:
+                    return p.device
+        # Already ordered by _port_rank (known VIDs, then USB ports); Bluetooth-like ports are never picked
+        if ports and _port_rank(ports[0]) < 3:
+            return ports[0].device
+        return None
@@ -1,7 +1,9 @@
 # code_manager.py
 # Stores parts of Arduino code in memory and allows their management
 
-from typing import List, Dict
+import sys
+import itertools
+from typing import List, Dict, Any
 
 ARDUINO_LIB_INCLUDE = "#include <Arduino.h>\n"
 BLOCK_GAP = "\n"
@@ -12,7 +14,34 @@ FUNCTIONS_SECTION_SEPARATOR = "//**Functions**\n"
 SETUP_SECTION_SEPARATOR = "//**Setup**\n"
 LOOP_SECTION_SEPARATOR = "//**Loop**\n"
 
-ALLOWED_SECTIONS = {"globals", "setup", "loop", "functions"}
+ALLOWED_SECTIONS = frozenset({"globals", "setup", "loop", "functions"})
+
+# Static parts of the generated sketch, joined once at import (see generate())
+_PREAMBLE = ARDUINO_LIB_INCLUDE + "\n" + GLOBAL_SECTION_SEPARATOR + "\n"
+_FUNCTIONS_HEADER = "\n" + BLOCK_GAP + "\n" + FUNCTIONS_SECTION_SEPARATOR + "\n"
+_SETUP_HEADER = "\n" + BLOCK_GAP + "\n" + SETUP_SECTION_SEPARATOR + "\nvoid setup() {\n\t"
+_LOOP_HEADER = "\n}\n" + BLOCK_GAP + "\n" + LOOP_SECTION_SEPARATOR + "\nvoid loop() {\n\t"
+_EPILOGUE = "\n}\n" + BLOCK_GAP
+
+# Text generated for an empty section
+_SECTION_PLACEHOLDERS = {
+    "globals": "// No globals variables defined",
+    "functions": "// No functions defined",
+    "setup": "//Setup code goes here",
+    "loop": "//Loop code goes here",
+}
+# Separator between cells of a section (setup/loop bodies are indented)
+_SECTION_JOINERS = {"globals": "\n", "functions": "\n", "setup": "\n\t", "loop": "\n\t"}
+
+# Stripped (interned) section separators -> section name (used when parsing exported code)
+_SECTION_BY_HEADER = {
+    sys.intern(GLOBAL_SECTION_SEPARATOR.strip()): "globals",
+    sys.intern(FUNCTIONS_SECTION_SEPARATOR.strip()): "functions",
+    sys.intern(SETUP_SECTION_SEPARATOR.strip()): "setup",
+    sys.intern(LOOP_SECTION_SEPARATOR.strip()): "loop",
+}
+# Stripped lines that carry no code
+_SKIP_LINES = frozenset({"", "{", "}"})
 
 class ArduinoCodeManager:
     """
@@ -20,6 +49,10 @@ class ArduinoCodeManager:
     
     Attributes:
         sections (Dict[str, Dict[str, str]]): Dictionary of code sections, each containing cell_id: code.
+        _linesets (Dict[str, Dict[str, tuple[str, frozenset]]]): Per section, cell_id -> (code, set of
+            its stripped lines); used by find_cell() and rebuilt when the cell code changes.
+        _cached (str|None): Last generated code; None when the sections changed since.
+        _section_text (Dict[str, str|None]): Rendered text per section; None when the section changed.
     """
     def __init__(self):
         """
@@ -39,6 +72,9 @@ class ArduinoCodeManager:
             "loop": {},
             "functions": {}
         }
+        self._linesets: Dict[str, Dict[str, tuple[str, frozenset]]] = {}
+        self._cached: str|None = None
+        self._section_text: Dict[str, str|None] = dict.fromkeys(ALLOWED_SECTIONS)
     
     def clear(self):
         """
@@ -46,11 +82,46 @@ class ArduinoCodeManager:
         """
         for key in self.sections:
             self.sections[key] = {}
+        self._linesets.clear()
+        self._mark_dirty()
+
+    def _mark_dirty(self, section: str|None = None):
+        """
+        Invalidates the generated code after the sections have changed.
+
+        Args:
+            section (str|None): The changed section; None invalidates all sections.
+        """
+        self._cached = None
+        if section is None:
+            self._section_text = dict.fromkeys(ALLOWED_SECTIONS)
+        else:
+            self._section_text[section] = None
+
+    def _render_section(self, section: str) -> str:
+        """
+        Returns the rendered text of a section, reusing it while the section is unchanged.
+
+        Args:
+            section (str): Section name.
+
+        Returns:
+            str: Cells joined for the sketch, or a placeholder comment for an empty section.
+        """
+        text = self._section_text.get(section)
+        if text is None:
+            cells = self.sections.get(section, {})
+            text = _SECTION_JOINERS[section].join(cells.values()) if cells else _SECTION_PLACEHOLDERS[section]
+            self._section_text[section] = text
+        return text
      
     def find_cell(self, section: str, code: str) -> str|None:
         """
         Finds the cell_id in a section that matches the given code.
 
+        A cell matches when it contains every (stripped, non-empty) line of the code;
+        the first matching cell is returned.
+
         Args:
             section (str): Section name ('globals', 'setup', 'loop', 'functions').
             code (str): Code to search for.
@@ -61,38 +132,57 @@ class ArduinoCodeManager:
         Raises:
             ValueError: If section is not found.
         """
-        if section not in self.sections:
-            raise ValueError(f"Unknown section: {section}")
-        cell_id = None
-        lines = code.split("\n")
-        for k, codes in self.sections[section].items():
-            for line in lines:
-                if line not in codes:
-                    break
-                else:
-                    cell_id = k
-        return cell_id
+        try:
+            cells = self.sections[section]
+        except KeyError:
+            raise ValueError(f"Unknown section: {section}") from None
+        query = frozenset(filter(None, (line.strip() for line in code.split("\n"))))
+        if not query:
+            return None
+        cache = self._linesets.setdefault(section, {})
+        for k, cell_code in cells.items():
+            entry = cache.get(k)
+            if entry is None or entry[0] is not cell_code:
+                entry = cache[k] = (cell_code, frozenset(line.strip() for line in cell_code.splitlines()))
+            if query <= entry[1]:
+                return k
+        return None
     
-    def replace_code(self, section: str, code: str, cell_id:str|None=None):
+    def replace_code(self, section: str, cell_id: str, code: str):
         """
-        Replaces code in a given section and cell.
+        Replaces the code of a known cell in a given section.
+
+        The cell keeps its position within the section.
 
         Args:
             section (str): Section name.
+            cell_id (str): Cell ID to replace.
             code (str): New code to replace.
-            cell_id (str|None): Cell ID to replace. If None, tries to find by code.
 
         Raises:
             ValueError: If section or cell_id is not found.
         """
-        if section not in self.sections:
-            raise ValueError(f"Unknown section: {section}")
-        if cell_id is None:
-            cell_id = self.find_cell(section, code)
-        if cell_id not in self.sections[section]:
+        try:
+            cells = self.sections[section]
+        except KeyError:
+            raise ValueError(f"Unknown section: {section}") from None
+        if cell_id not in cells:
             raise ValueError(f"Error when replacing code, unknown cell: {cell_id}")
-        self.remove_code(section, cell_id)
-        self.add_code(section, cell_id, code)
+        cells[cell_id] = code.strip()
+        self._mark_dirty(section)
+
+    def replace_code_by_content(self, section: str, code: str):
+        """
+        Replaces the code of the cell found by its content (see find_cell()).
+
+        Args:
+            section (str): Section name.
+            code (str): New code to replace.
+
+        Raises:
+            ValueError: If section is not found or no cell matches the code.
+        """
+        self.replace_code(section, self.find_cell(section, code), code)
     
     def remove_code(self, section: str, cell_id:str|None=None):
         """
@@ -105,17 +195,22 @@ class ArduinoCodeManager:
         Raises:
             ValueError: If section is not found.
         """
-        if section not in self.sections:
-            raise ValueError(f"Unknown section: {section}")
+        try:
+            cells = self.sections[section]
+        except KeyError:
+            raise ValueError(f"Unknown section: {section}") from None
         if cell_id is not None:
-            if cell_id in self.sections[section]:
-                del self.sections[section][cell_id]
+            if cell_id in cells:
+                del cells[cell_id]
+                self._linesets.get(section, {}).pop(cell_id, None)
             else:
                 raise ValueError(f"Cell ID '{cell_id}' not found in section '{section}'.")
         else:
             self.sections[section] = {}
+            self._linesets.pop(section, None)
+        self._mark_dirty(section)
 
-    def add_code(self, section: str, cell_id:str, code: str):
+    def add_code(self, section: str, cell_id:str, code: str, _normalized: bool = False):
         """
         Adds a code snippet to the selected section.
 
@@ -123,13 +218,17 @@ class ArduinoCodeManager:
             section (str): One of ["globals", "setup", "loop", "functions"].
             cell_id (str): Identifier for the code cell.
             code (str): Code text (without leading and trailing spaces).
+            _normalized (bool): Internal – the code is already stripped, skip strip().
 
         Raises:
             ValueError: If section is not found.
         """
-        if section not in self.sections:
-            raise ValueError(f"Unknown section: {section}")
-        self.sections[section][cell_id] = code.strip()
+        try:
+            cells = self.sections[section]
+        except KeyError:
+            raise ValueError(f"Unknown section: {section}") from None
+        cells[cell_id] = code if _normalized else code.strip()
+        self._mark_dirty(section)
 
     def get_section(self, section: str) -> List[str]:
         """
@@ -144,53 +243,37 @@ class ArduinoCodeManager:
         Raises:
             ValueError: If section is not found.
         """
-        if section not in self.sections:
-            raise ValueError(f"Unknown section: {section}")
-        cells = self.sections[section]
-        return [cell for cell in cells.values()]
+        try:
+            cells = self.sections[section]
+        except KeyError:
+            raise ValueError(f"Unknown section: {section}") from None
+        return list(cells.values())
 
     def generate(self) -> str:
         """
         Generates the complete Arduino code as text from all sections.
 
+        The result is cached until the sections change; unchanged sections are not
+        rejoined.
+
         Returns:
             str: The generated Arduino code as a single string.
         """
-        lines = []
-        # Include Arduino lib
-        lines.append(ARDUINO_LIB_INCLUDE)
-        
-        # Global variables
-        lines.append(GLOBAL_SECTION_SEPARATOR)
-        section = self.get_section("globals")
-        lines.extend(section if len(section) > 0 else ["// No globals variables defined"])
-        lines.append(BLOCK_GAP)
-        
-        # Functions
-        lines.append(FUNCTIONS_SECTION_SEPARATOR)
-        section = self.get_section("functions")
-        lines.extend(section if len(section) > 0 else ["// No functions defined"])
-        lines.append(BLOCK_GAP)
-
-        # setup
-        lines.append(SETUP_SECTION_SEPARATOR)
-        lines.append("void setup() {")
-        section = self.get_section("setup")
-        setup_lines = section if len(section) > 0 else ["//Setup code goes here"]
-        lines.extend(["\t" + line for line in setup_lines])
-        lines.append("}")
-        lines.append(BLOCK_GAP)
-
-        # loop
-        lines.append(LOOP_SECTION_SEPARATOR)
-        lines.append("void loop() {")
-        section = self.get_section("loop")
-        loop_lines = section if len(section) > 0 else ["//Loop code goes here"]
-        lines.extend(["\t" + line for line in loop_lines])
-        lines.append("}")
-        lines.append(BLOCK_GAP)
-
-        return "\n".join(lines)
+        if self._cached is not None:
+            return self._cached
+        render = self._render_section
+        self._cached = "".join((
+            _PREAMBLE,
+            render("globals"),
+            _FUNCTIONS_HEADER,
+            render("functions"),
+            _SETUP_HEADER,
+            render("setup"),
+            _LOOP_HEADER,
+            render("loop"),
+            _EPILOGUE,
+        ))
+        return self._cached
     
     def export_as_code(self) -> str:
         """
@@ -223,38 +306,35 @@ class ArduinoCodeManager:
         self.clear()  # Clears existing code
         lines = code.splitlines()
         current_section = None
-        cell_id = 0
+        target = None  # cells of the current section
+        cell_ids = itertools.count()
         
+        sections = self.sections
         for line in lines:
             stripped_line = line.strip()
-            if not stripped_line or stripped_line in ["{", "}"]:
-                continue
-            elif stripped_line == GLOBAL_SECTION_SEPARATOR.strip():
-                if current_section != "globals":
-                    cell_id = 0
-                    current_section = "globals"
+            if stripped_line in _SKIP_LINES:
                 continue
-            elif stripped_line == FUNCTIONS_SECTION_SEPARATOR.strip():
-                if current_section != "functions":
-                    cell_id = 0
-                    current_section = "functions"
-                continue
-            elif stripped_line == SETUP_SECTION_SEPARATOR.strip() or stripped_line.startswith("void setup()"):
-                if current_section != "setup":
-                    cell_id = 0
-                    current_section = "setup"
-                continue
-            elif stripped_line == LOOP_SECTION_SEPARATOR.strip() or stripped_line.startswith("void loop()"):
-                if current_section != "loop":
-                    cell_id = 0
-                    current_section = "loop"
-                continue
-            else:
-                if current_section:
-                    self.sections[current_section][str(cell_id)] = stripped_line
-                    cell_id += 1
+            # Cheap prefix gate first: regular code lines skip all header lookups
+            if stripped_line.startswith("//**"):
+                header = _SECTION_BY_HEADER.get(stripped_line)
+            elif stripped_line.startswith("void "):
+                if stripped_line.startswith("void setup()"):
+                    header = "setup"
+                elif stripped_line.startswith("void loop()"):
+                    header = "loop"
                 else:
-                    raise ValueError("Code does not contain any section or is incorrectly formatted.")
+                    header = None
+            else:
+                header = None
+            if header is not None:
+                if current_section != header:
+                    current_section = header
+                    target = sections[header]
+                    cell_ids = itertools.count()
+                continue
+            if target is None:
+                raise ValueError("Code does not contain any section or is incorrectly formatted.")
+            target[str(next(cell_ids))] = stripped_line
                 
     def import_from_json(self, json_data: Dict[str, Dict[str, str]]):
         """
@@ -266,13 +346,30 @@ class ArduinoCodeManager:
         Raises:
             ValueError: If JSON data contains invalid sections.
         """
-        self.clear()
         # Check validity of sections
-        valid_sections = {"globals", "setup", "loop", "functions"}
-        if not all(section in valid_sections for section in json_data.keys()):
+        if not ALLOWED_SECTIONS.issuperset(json_data):
             raise ValueError("Invalid sections in JSON data.")
-        self.sections = json_data
+        # Missing sections are filled in, so every section is always present
+        self.sections = {section: json_data.get(section, {}) for section in ("globals", "setup", "loop", "functions")}
+        self._linesets.clear()
+        self._mark_dirty()
         
     
-# Singleton instance
-code_manager = ArduinoCodeManager()
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    """
+    Lazily creates the singleton code manager on first access (PEP 562).
+
+    Args:
+        name (str): Attribute name requested from the module.
+
+    Returns:
+        Any: The global ArduinoCodeManager instance for "code_manager".
+
+    Raises:
+        AttributeError: If the attribute does not exist.
+    """
+    if name == "code_manager":
+        manager = ArduinoCodeManager()  # Singleton instance
+        globals()["code_manager"] = manager
+        return manager
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
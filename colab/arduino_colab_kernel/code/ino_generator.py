@@ -2,6 +2,7 @@
 # Generates and saves a .ino file from prepared code
 
 import os
+import hashlib
 
 class InoGenerator:
     def __init__(self, filename:str = "sketch.ino", output_dir: str = "./arduino_sketch", prepare_dirs = True):
@@ -18,10 +19,14 @@ class InoGenerator:
         fn = filename if filename.endswith(".ino") else filename + ".ino"
         self.output_dir = output_dir
         self.ino_file = os.path.join(output_dir, fn)
+        # Resolved once, so later calls do not depend on (or re-query) the working directory
+        self._abs_path = os.path.abspath(self.ino_file)
+        self._abs_dir = os.path.dirname(self._abs_path)
+        self._last_hash: bytes|None = None  # digest of the last written content
         
         if prepare_dirs:
             try:
-                os.makedirs(self.output_dir, exist_ok=True)
+                os.makedirs(self._abs_dir, exist_ok=True)
             except Exception as e:
                 raise OSError(f"Failed to create output directory '{self.output_dir}': {e}")
 
@@ -29,6 +34,11 @@ class InoGenerator:
         """
         Writes code to a .ino file in the target directory.
 
+        The code is written to a temporary file next to the sketch and moved into place
+        with os.replace(), so the toolchain never sees a partially written sketch. The
+        write is skipped when the content is identical to the last export and the
+        file is still there, so the file's mtime (and the cached build) stays valid.
+
         Args:
             code (str): Complete Arduino code as text.
 
@@ -36,10 +46,44 @@ class InoGenerator:
             OSError: If the file cannot be written.
         """
         try:
-            with open(self.ino_file, "w", encoding="utf-8") as f:
-                f.write(code)
+            # Encode once and write the bytes directly (no text-layer buffering)
+            data = code.encode("utf-8")
+            digest = hashlib.blake2b(data, digest_size=16).digest()
+            if digest == self._last_hash and self._unchanged_on_disk(len(data)):
+                return
+            view = memoryview(data)
+            tmp = self._abs_path + ".tmp"
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                while view:
+                    view = view[os.write(fd, view):]
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp, self._abs_path)
+            self._last_hash = digest
         except Exception as e:
+            self._last_hash = None
+            try:
+                os.remove(self._abs_path + ".tmp")
+            except OSError:
+                pass
             raise OSError(f"Failed to write to .ino file '{self.ino_file}': {e}")
+
+    def _unchanged_on_disk(self, size: int) -> bool:
+        """
+        Checks that the last exported file still exists with the expected size.
+
+        Args:
+            size (int): Size in bytes of the last written content.
+
+        Returns:
+            bool: True if the file exists and has the given size.
+        """
+        try:
+            return os.stat(self._abs_path).st_size == size
+        except OSError:
+            return False
             
     def load(self) -> str:
         """
@@ -52,13 +96,12 @@ class InoGenerator:
             FileNotFoundError: If the .ino file does not exist.
             OSError: If the file cannot be read.
         """
-        ino_file = self.get_path()
-        if not os.path.exists(ino_file):
-            raise FileNotFoundError(f"No .ino file found at path: {ino_file}.")
-        
+        ino_file = self._abs_path
         try:
             with open(ino_file, "r", encoding="utf-8") as f:
                 return f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No .ino file found at path: {ino_file}.")
         except Exception as e:
             raise OSError(f"Failed to read .ino file '{ino_file}': {e}")
 
@@ -69,4 +112,4 @@ class InoGenerator:
         Returns:
             str: Absolute path to the .ino file.
         """
-        return  os.path.abspath(self.ino_file)
\ No newline at end of file
+        return self._abs_path
\ No newline at end of file
@@ -2,23 +2,15 @@
 # Line magic %board – board selection, serial port, build/upload and utilities (with port autodetection and logging).
 
 import os
-import shlex
+import argparse
+from typing import Final
 from IPython.core.magic import Magics, magics_class, line_magic
 from IPython.display import Markdown, display
 
-from arduino_colab_kernel.board.board_manager import board_manager
-from arduino_colab_kernel.project.project_manager import project_manager
-from arduino_colab_kernel.bridge.bridge import bridge_manager
-from arduino_colab_kernel.bridge.serial_port import list_serial_ports
+from arduino_colab_kernel.utils.utils_magic import command_token, emit, emit_error, lazy, split_magic_args
 
-def _help() -> str:
-    """
-    Returns help text for the %board magic command.
-
-    Returns:
-        str: Markdown-formatted help text.
-    """
-    text = """
+# Help text, built once at import
+_HELP_MD: Final[str] = """
 ### 🔧 Available `%board` commands
 
 | Command                          | Parameters                                                     | Description                                                           |
@@ -29,10 +21,90 @@ def _help() -> str:
 | **`%board compile`**              | `[sketch_dir_or_ino] [--log-file path]`*(optional)*           | Compiles sketch for the currently selected board.                     |
 | **`%board upload`**               | `[sketch_dir_or_ino] [--log-file path]`*(optional)*           | Uploads sketch to the currently selected board.                       |
 | **`%board list`**                 | *(no parameters)*                                             | Lists available supported boards.                                     |
-| **`%board ports`**                | *(no parameters)*                                             | Lists available serial ports.                                         |
+| **`%board ports`**                | `[--refresh]`*(optional)*                                     | Lists available serial ports (`--refresh` re-scans immediately).      |
 | **`%board help`** / **`?`**       | *(no parameters)*                                             | Shows this help.                                                      |
     """
-    return text
+_HELP_DISPLAY = Markdown(_HELP_MD)
+_UNKNOWN_TMPL = "**Unknown command:** `{}`\n\n" + _HELP_MD.replace("{", "{{").replace("}", "}}")  # braces escaped for str.format
+
+# Constant messages, built once at import
+_USAGE_SELECT = Markdown("**Usage:** `%board select [uno|nano] [--port COMx]`")
+_USAGE_SERIAL = Markdown(
+    "**Usage:** `%board serial --port COMx [--baud 115200] [--timeout 0.1] "
+    "[--encoding utf-8] [--strip true|false]`"
+)
+_MISSING_LOG_FILE = Markdown("**Missing value for `--log-file`.**")
+_NO_BOARDS = Markdown("**No supported board found.**")
+_NO_PORTS = Markdown("**No serial port found.**")
+
+# Default log file names (inside the project's logs dir) and success messages
+_COMPILE_LOG_NAME = "compile.log"
+_UPLOAD_LOG_NAME = "upload.log"
+_OK_COMPILE = "✅ **Compilation successful.**"
+_OK_UPLOAD = "🚀 **Upload complete.**"
+_LOG_SUFFIX = " Log: `{}`"
+
+# Message templates (str.format fields, filled by emit())
+_TPL_UNKNOWN_ARG = "**Unknown argument for `{}`:** `{}`"
+_TPL_SELECTED = "✅ Board **{}** set (FQBN `{}`) &nbsp;|&nbsp; "
+_TPL_SELECTED_PORT = _TPL_SELECTED + "Port: `{}` (explicit)"
+_TPL_SELECTED_AUTO = _TPL_SELECTED + "Auto port: `{}`"
+_TPL_SELECTED_NO_PORT = _TPL_SELECTED + "_Port n/a – set `%board serial --port COMx`_"
+_TPL_STATUS = (
+    "**Board status**\n\n"
+    "- Board: `{}`\n"
+    "- FQBN: `{}`\n"
+    "- Port: `{}`\n"
+    "- Baud: `{}`\n"
+    "- Timeout: `{}`\n"
+    "- Encoding: `{}`\n"
+    "- Auto strip: `{}`\n"
+)
+_TPL_SERIAL_CFG = "🔧 Serial configuration: port=`{}` baud=`{}` timeout=`{}` enc=`{}` strip=`{}`"
+
+# Flag values read as True (case-insensitive)
+_TRUTHY = frozenset({"1", "true", "yes", "y", "on"})
+
+def _bool_arg(value: str) -> bool:
+    """
+    Converts a command line flag value to bool ("1", "true", "yes", "y", "on" are True).
+    """
+    return value.lower() in _TRUTHY
+
+# Argument parsers, built once at import (parse_known_args reports unknown arguments instead of exiting)
+_SELECT_P = argparse.ArgumentParser(prog="%board select", add_help=False, allow_abbrev=False, exit_on_error=False)
+_SELECT_P.add_argument("name", nargs="?")
+_SELECT_P.add_argument("--port")
+
+_SERIAL_P = argparse.ArgumentParser(prog="%board serial", add_help=False, allow_abbrev=False, exit_on_error=False)
+_SERIAL_P.add_argument("--port")
+_SERIAL_P.add_argument("--baud", dest="baudrate", type=int)
+_SERIAL_P.add_argument("--timeout", type=float)
+_SERIAL_P.add_argument("--encoding")
+_SERIAL_P.add_argument("--strip", "--autostrip", dest="autostrip", type=_bool_arg)
+
+_LOG_P = argparse.ArgumentParser(add_help=False, allow_abbrev=False, exit_on_error=False)
+_LOG_P.add_argument("--log-file", dest="log_file")
+
+def _parse_known(parser: argparse.ArgumentParser, args: list[str], cmd: str) -> argparse.Namespace:
+    """
+    Parses arguments with a prebuilt parser and reports unknown ones.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser for the command.
+        args (list[str]): List of arguments.
+        cmd (str): Command name used in the message about unknown arguments.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+
+    Raises:
+        argparse.ArgumentError: If a value is missing or has a wrong type.
+    """
+    ns, unknown = parser.parse_known_args(args)
+    for a in unknown:
+        emit(_TPL_UNKNOWN_ARG, cmd, a)
+    return ns
 
 def _parse_select_args(args: list[str]) -> tuple[str|None, dict]:
     """
@@ -46,17 +118,9 @@ def _parse_select_args(args: list[str]) -> tuple[str|None, dict]:
     """
     if not args:
         return None, {}
-    name = args[0].lower()
-    cfg = {}
-    i = 1
-    while i < len(args):
-        a = args[i]
-        if a == "--port":
-            i += 1; cfg["port"] = args[i]
-        else:
-            display(Markdown(f"**Unknown argument for `set`:** `{a}`"))
-        i += 1
-    return name, cfg
+    ns = _parse_known(_SELECT_P, args, "select")
+    cfg = {"port": ns.port} if ns.port is not None else {}
+    return (ns.name.lower() if ns.name else None), cfg
 
 def _parse_serial_args(args: list[str]) -> dict:
     """
@@ -68,24 +132,8 @@ def _parse_serial_args(args: list[str]) -> dict:
     Returns:
         dict: Serial configuration dictionary.
     """
-    cfg = {"port": None, "baudrate": None, "timeout": None, "encoding": None, "autostrip": None}
-    i = 0
-    while i < len(args):
-        a = args[i]
-        if a == "--port":
-            i += 1; cfg["port"] = args[i]
-        elif a == "--baud":
-            i += 1; cfg["baudrate"] = int(args[i])
-        elif a == "--timeout":
-            i += 1; cfg["timeout"] = float(args[i])
-        elif a == "--encoding":
-            i += 1; cfg["encoding"] = args[i]
-        elif a in ("--strip", "--autostrip"):
-            i += 1; cfg["autostrip"] = args[i].lower() in ("1", "true", "yes", "y")
-        else:
-            display(Markdown(f"**Unknown argument for `serial`:** `{a}`"))
-        i += 1
-    return {k: v for k, v in cfg.items() if v is not None}
+    ns = _parse_known(_SERIAL_P, args, "serial")
+    return {k: v for k, v in vars(ns).items() if v is not None}
 
 def _parse_logfile(args: list[str]) -> tuple[list[str], str | None]:
     """
@@ -97,21 +145,152 @@ def _parse_logfile(args: list[str]) -> tuple[list[str], str | None]:
     Returns:
         tuple[list[str], str|None]: (args_without_log, log_file|None)
     """
-    out = []
-    log_file = None
-    i = 0
-    while i < len(args):
-        a = args[i]
-        if a == "--log-file":
-            if i + 1 >= len(args):
-                display(Markdown("**Missing value for `--log-file`.**"))
-                return args, None
-            log_file = args[i + 1]
-            i += 2
-            continue
-        out.append(a)
-        i += 1
-    return out, log_file
+    try:
+        ns, rest = _LOG_P.parse_known_args(args)
+    except argparse.ArgumentError:
+        display(_MISSING_LOG_FILE)
+        # Drop the dangling flag so later parsing does not see it again
+        return [a for a in args if a != "--log-file"], None
+    return rest, ns.log_file
+
+def _log_file_for(rest: list[str], default_name: str) -> str:
+    """
+    Returns the --log-file path from the arguments, or the default log in the project's logs dir.
+
+    The path is made absolute once here, so handlers can show it without further path calls.
+
+    Args:
+        rest (list[str]): Arguments after the command.
+        default_name (str): File name used inside the logs directory when no path is given.
+
+    Returns:
+        str: Absolute log file path.
+    """
+    if rest:
+        rest, custom_log = _parse_logfile(rest)
+        if custom_log:
+            return os.path.abspath(custom_log)
+    # Only query the project when the user did not supply a path
+    return os.path.join(lazy("project_manager").get_logs_dir(as_abs=True), default_name)
+
+# ----- Command handlers (rest = arguments after the command) -----
+def _cmd_help(rest: list[str]) -> None:
+    """Shows the help."""
+    display(_HELP_DISPLAY)
+
+def _cmd_list(rest: list[str]) -> None:
+    """Lists supported boards."""
+    boards = lazy("board_manager").list_boards().items()
+    if boards:
+        emit("**Available boards:**  \n" + "\n".join(f"- `{name}` (FQBN: `{fqbn}`)" for name, fqbn in boards))
+    else:
+        display(_NO_BOARDS)
+
+def _cmd_select(rest: list[str]) -> None:
+    """Selects a board and optionally its port."""
+    name, cfg = _parse_select_args(rest)
+    if not name:
+        display(_USAGE_SELECT)
+        return
+
+    # Set board
+    board_manager = lazy("board_manager")
+    board_manager.select_board(name)
+    b = board_manager.require_board()
+
+    # Set board configuration
+    b.configure(**cfg)
+
+    # Port – either explicitly set or autodetected
+    if "port" in cfg:
+        emit(_TPL_SELECTED_PORT, b.name, b.fqbn, cfg["port"])
+    elif b.port:
+        emit(_TPL_SELECTED_AUTO, b.name, b.fqbn, b.port)
+    else:
+        emit(_TPL_SELECTED_NO_PORT, b.name, b.fqbn)
+
+def _cmd_status(rest: list[str]) -> None:
+    """Shows the current board settings."""
+    b = lazy("board_manager").require_board()
+    sp = b.serial
+    emit(_TPL_STATUS, b.name, b.fqbn, sp.port or "not set", sp.baudrate, sp.timeout, sp.encoding, sp.autostrip)
+
+def _cmd_serial(rest: list[str]) -> None:
+    """Configures the serial port of the board."""
+    b = lazy("board_manager").require_board()
+    kv = _parse_serial_args(rest)
+    if not kv:
+        display(_USAGE_SERIAL)
+        return
+    b.configure(**kv)
+    sp = b.serial
+    emit(_TPL_SERIAL_CFG, sp.port, sp.baudrate, sp.timeout, sp.encoding, sp.autostrip)
+
+def _cmd_compile(rest: list[str]) -> None:
+    """Saves the project and compiles it for the selected board."""
+    log_file = _log_file_for(rest, _COMPILE_LOG_NAME)
+    b = lazy("board_manager").require_board()
+    sketch_dir = lazy("project_manager").save()
+    bridge_manager = lazy("bridge_manager")
+    ok = bridge_manager.compile(board=b, sketch_source=sketch_dir, log_file=log_file)
+    if log_file:
+        # The record is written in the background: wait for it (and report write errors)
+        # before showing the path
+        bridge_manager.flush_logs()
+    if ok and log_file:
+        emit(_OK_COMPILE + _LOG_SUFFIX, log_file)
+    elif ok:
+        emit(_OK_COMPILE)
+
+def _cmd_upload(rest: list[str]) -> None:
+    """Saves the project and uploads it to the selected board."""
+    log_file = _log_file_for(rest, _UPLOAD_LOG_NAME)
+    b = lazy("board_manager").require_board()
+    sketch_dir = lazy("project_manager").save()
+    bridge_manager = lazy("bridge_manager")
+    ok = bridge_manager.upload(board=b, sketch_source=sketch_dir, log_file=log_file)
+    if log_file:
+        # The record is written in the background: wait for it (and report write errors)
+        # before showing the path
+        bridge_manager.flush_logs()
+    if ok and log_file:
+        emit(_OK_UPLOAD + _LOG_SUFFIX, log_file)
+    elif ok:
+        emit(_OK_UPLOAD)
+
+def _cmd_ports(rest: list[str]) -> None:
+    """Lists available serial ports (the enumeration is cached briefly; --refresh re-scans)."""
+    if "--refresh" in rest:
+        lazy("SerialPort").invalidate_port_cache()
+    ports = lazy("list_serial_ports")()
+    if ports:
+        emit("**Available serial ports:**  \n" + "\n".join(f"- `{p}`" for p in ports))
+    else:
+        display(_NO_PORTS)
+
+# Command name -> prefix of the error message shown when its handler raises
+_ERROR_PREFIX = {
+    "list": "Error listing boards",
+    "select": "Error selecting board",
+    "status": "Error showing status",
+    "serial": "Error configuring serial",
+    "compile": "Error during compilation",
+    "upload": "Error during upload",
+    "ports": "Error listing ports",
+}
+
+# Command name -> handler (handlers raise; BoardMagic.board reports the error)
+_DISPATCH = {
+    "help": _cmd_help,
+    "?": _cmd_help,
+    "list": _cmd_list,
+    "select": _cmd_select,
+    "status": _cmd_status,
+    "serial": _cmd_serial,
+    "compile": _cmd_compile,
+    "upload": _cmd_upload,
+    "ports": _cmd_ports,
+}
 
 @magics_class
 class BoardMagic(Magics):
@@ -130,152 +309,25 @@ class BoardMagic(Magics):
         Raises:
             Displays errors as Markdown output, does not raise.
         """
-        args = shlex.split(line)
+        try:
+            args = split_magic_args(line)
+        except ValueError as e:
+            emit_error("Error parsing arguments", e)
+            return
         if not args:
-            display(Markdown(_help()))
+            display(_HELP_DISPLAY)
             return
 
-        cmd = args[0].lower()
-        rest = args[1:]
-
+        cmd = command_token(args[0])
+        handler = _DISPATCH.get(cmd)
+        if handler is None:
+            emit(_UNKNOWN_TMPL, cmd)
+            return
+        # Single error boundary for all handlers; the prefix names the failed command
         try:
-            if cmd == "help" or cmd == "?":
-                display(Markdown(_help()))
-                return
-
-            if cmd == "list":
-                try:
-                    boards = board_manager.list_boards().items()
-                    if boards:
-                        display(Markdown("**Available boards:**  \n" + "\n".join(f"- `{name}` (FQBN: `{fqbn}`)" for name, fqbn in boards)))
-                    else:
-                        display(Markdown("**No supported board found.**"))
-                except Exception as e:
-                    display(Markdown(f"**Error listing boards:** `{e}`"))
-                return
-
-            if cmd == "select":
-                try:
-                    name, cfg = _parse_select_args(rest)
-                    if not name:
-                        display(Markdown("**Usage:** `%board select [uno|nano] [--port COMx]`"))
-                        return
-
-                    # Set board
-                    board_manager.select_board(name)
-                    b = board_manager.require_board()
-
-                    # Set board configuration
-                    b.configure(**cfg)
-
-                    # Port – either explicitly set or autodetected
-                    if "port" in cfg:
-                        display(Markdown(
-                            f"✅ Board **{b.name}** set (FQBN `{b.fqbn}`) &nbsp;|&nbsp; Port: `{cfg['port']}` (explicit)"
-                        ))
-                    else:
-                        if b.port:
-                            display(Markdown(
-                                f"✅ Board **{b.name}** set (FQBN `{b.fqbn}`) &nbsp;|&nbsp; Auto port: `{b.port}`"
-                            ))
-                        else:
-                            display(Markdown(
-                                f"✅ Board **{b.name}** set (FQBN `{b.fqbn}`) &nbsp;|&nbsp; "
-                                "_Port n/a – set `%board serial --port COMx`_"
-                            ))
-                except Exception as e:
-                    display(Markdown(f"**Error selecting board:** `{e}`"))
-                return
-
-            if cmd == "status":
-                try:
-                    b = board_manager.require_board()
-                    sp = b.serial
-                    display(Markdown(
-                        f"**Board status**\n\n"
-                        f"- Board: `{b.name}`\n"
-                        f"- FQBN: `{b.fqbn}`\n"
-                        f"- Port: `{sp.port or 'not set'}`\n"
-                        f"- Baud: `{sp.baudrate}`\n"
-                        f"- Timeout: `{sp.timeout}`\n"
-                        f"- Encoding: `{sp.encoding}`\n"
-                        f"- Auto strip: `{sp.autostrip}`\n"
-                    ))
-                except Exception as e:
-                    display(Markdown(f"**Error showing status:** `{e}`"))
-                return
-
-            if cmd == "serial":
-                try:
-                    b = board_manager.require_board()
-                    kv = _parse_serial_args(rest)
-                    if not kv:
-                        display(Markdown(
-                            "**Usage:** `%board serial --port COMx [--baud 115200] [--timeout 0.1] "
-                            "[--encoding utf-8] [--strip true|false]`"
-                        ))
-                        return
-                    b.configure(**kv)
-                    sp = b.serial
-                    display(Markdown(
-                        f"🔧 Serial configuration: port=`{sp.port}` baud=`{sp.baudrate}` "
-                        f"timeout=`{sp.timeout}` enc=`{sp.encoding}` strip=`{sp.autostrip}`"
-                    ))
-                except Exception as e:
-                    display(Markdown(f"**Error configuring serial:** `{e}`"))
-                return
-
-            if cmd == "compile":
-                try:
-                    log_file = os.path.join(project_manager.get_logs_dir(as_abs=False), "compile.log")
-                    if rest:
-                        rest, log_file = _parse_logfile(rest)
-                        
-                    b = board_manager.require_board()
-                    sketch_dir = project_manager.save()
-                    ok = bridge_manager.compile(board=b, sketch_source=sketch_dir, log_file=log_file)
-                    if ok:
-                        msg = "✅ **Compilation successful.**"
-                        if log_file:
-                            msg += f" Log: `{os.path.abspath(log_file)}`"
-                        display(Markdown(msg))
-                except Exception as e:
-                    display(Markdown(f"**Error during compilation:** `{e}`"))
-                return
-
-            if cmd == "upload":
-                try:
-                    log_file = os.path.join(project_manager.get_logs_dir(as_abs=False), "upload.log")
-                    if rest:
-                        rest, log_file = _parse_logfile(rest)
-                    
-                    b = board_manager.require_board()
-                    sketch_dir = project_manager.save()
-                    ok = bridge_manager.upload(board=b, sketch_source=sketch_dir, log_file=log_file)
-                    if ok:
-                        msg = "🚀 **Upload complete.**"
-                        if log_file:
-                            msg += f" Log: `{os.path.abspath(log_file)}`"
-                        display(Markdown(msg))
-                except Exception as e:
-                    display(Markdown(f"**Error during upload:** `{e}`"))
-                return
-
-            if cmd == "ports":
-                try:
-                    ports = list_serial_ports()
-                    if ports:
-                        display(Markdown("**Available serial ports:**  \n" + "\n".join(f"- `{p}`" for p in ports)))
-                    else:
-                        display(Markdown("**No serial port found.**"))
-                except Exception as e:
-                    display(Markdown(f"**Error listing ports:** `{e}`"))
-                return
-
-            display(Markdown(f"**Unknown command:** `{cmd}`\n\n" + _help()))
-
+            handler(args[1:])
         except Exception as e:
-            display(Markdown(f"**Error:** `{e}`"))
+            emit_error(_ERROR_PREFIX.get(cmd) or f"Error in `%board {cmd}`", e)
 
 def load_ipython_extension(ipython):
     """
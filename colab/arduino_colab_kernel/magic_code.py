@@ -1,24 +1,17 @@
 # magic_code.py
 # Magic %%code – saves code into sections (globals/setup/loop/functions) with optional cell ID.
-# Contains clear help via _help_text().
+# Contains clear help via _HELP_MD.
 
-import shlex
+import functools
+from typing import Final
 from IPython.core.magic import Magics, magics_class, cell_magic
 from IPython.display import Markdown, display
 
-from arduino_colab_kernel.code.code_manager import code_manager
-from arduino_colab_kernel.project.project_manager import project_manager
-from arduino_colab_kernel.code.code_manager import ALLOWED_SECTIONS
+from arduino_colab_kernel.utils.utils_magic import command_token, emit, emit_error, lazy, split_magic_args
 
 
-def _help() -> str:
-    """
-    Returns Markdown help text for the %%code magic command.
-
-    Returns:
-        str: Markdown-formatted help text.
-    """
-    return """
+# Help text, built once at import
+_HELP_MD: Final[str] = """
 ### 🧩 Available `%%code` commands
 
 | Command                  | Parameters                     | Description                                                             |
@@ -50,6 +43,58 @@ digitalWrite(led, LOW);  delay(500);
 %%code functions
 int readSensor() { return analogRead(A0); }
 """
+_HELP_DISPLAY = Markdown(_HELP_MD)
+_UNKNOWN_TMPL = "**Unknown code section or command:** `{}`\n\n" + _HELP_MD.replace("{", "{{").replace("}", "}}")  # braces escaped for str.format
+_TPL_SAVED = "`Code updated` &nbsp;|&nbsp; section: `{}`, cell: `{}`."
+
+# Section -> bound code_manager.add_code for that section, filled on first %%code call
+_SECTION_DISPATCH: dict = {}
+
+def _section_handler(section):
+    """
+    Returns the add-code handler for a section, or None for an unknown section.
+
+    Args:
+        section (str|None): Section name (interned, lower case).
+
+    Returns:
+        Callable[[str, str], None] | None: handler(cell_id, code).
+    """
+    if not _SECTION_DISPATCH:
+        add_code = lazy("code_manager").add_code
+        _SECTION_DISPATCH.update((s, functools.partial(add_code, s)) for s in lazy("ALLOWED_SECTIONS"))
+    return _SECTION_DISPATCH.get(section)
+
+# ----- Command handlers (section, parts = all arguments, cell = cell body) -----
+def _do_help(section, parts: list[str], cell: str) -> None:
+    """Shows the help."""
+    display(_HELP_DISPLAY)
+
+def _do_save(section, parts: list[str], cell: str) -> None:
+    """Saves the cell into a section (cell ID defaults to "0") and saves the project."""
+    # --- Section validation (one lookup also yields the handler) ---
+    handler = _section_handler(section)
+    if handler is None:
+        emit(_UNKNOWN_TMPL, section)
+        return
+    # --- Cell ID (optional) ---
+    cell_id = parts[1] if len(parts) > 1 else "0"
+    # --- Save code to correct section/cell ---
+    try:
+        handler(cell_id, cell)
+        # Save changes
+        lazy("project_manager").save()
+        emit(_TPL_SAVED, section, cell_id)
+    except Exception as e:
+        emit_error("Error saving code", e)
+
+# First word -> handler; anything else is treated as a section name (_do_save)
+_CMDS = {
+    None: _do_help,
+    "help": _do_help,
+    "?": _do_help,
+}
+
 @magics_class
 class CodeMagics(Magics):
     """
@@ -74,31 +119,16 @@ class CodeMagics(Magics):
         Raises:
             Does not raise; all exceptions are caught and displayed as Markdown.
         """
-        # --- Argument parsing (safely via shlex) ---
+        # --- Argument parsing (shlex only when quoting is used) ---
         try:
-            parts = shlex.split(line.strip()) if line else []
-            section = parts[0].lower() if parts else None
+            parts = split_magic_args(line)
+            section = command_token(parts[0]) if parts else None
         except Exception as e:
-            display(Markdown(f"**Error parsing arguments:** `{e}`"))
+            emit_error("Error parsing arguments", e)
             return
 
-        # --- Help / empty input ---
-        if section in (None, "help", "?"):
-            display(Markdown(_help()))
-        # --- Section validation ---
-        elif section in ALLOWED_SECTIONS:
-            # --- Cell ID (optional) ---
-            cell_id = parts[1] if len(parts) > 1 else "0"
-            # --- Save code to correct section/cell ---
-            try:
-                code_manager.add_code(section, cell_id, cell)
-                # Save changes
-                project_manager.save()
-                display(Markdown(f"`Code updated` &nbsp;|&nbsp; section: `{section}`, cell: `{cell_id}`."))
-            except Exception as e:
-                display(Markdown(f"**Error saving code:** `{e}`"))
-        else:
-            display(Markdown(f"**Unknown code section or command:** `{section}`\n\n" + _help()))
+        # --- Help / empty input, otherwise save into the section ---
+        _CMDS.get(section, _do_save)(section, parts, cell)
 
 def load_ipython_extension(ipython):
     """
@@ -1,21 +1,14 @@
 # magic_arduino.py
-import os
-import shlex
-import json
-from IPython.core.magic import Magics, magics_class, cell_magic, line_magic
+import argparse
+from typing import Final
+from IPython.core.magic import Magics, magics_class, line_magic
 from IPython.display import Markdown, display
 
-from arduino_colab_kernel.project.project_manager import project_manager
 from arduino_colab_kernel.project.config import DEFAULT_PROJECT_NAME, LOCAL_MODE, REMOTE_MODE
+from arduino_colab_kernel.utils.utils_magic import command_token, emit, emit_error, lazy, split_magic_args
 
-def _help() -> str:
-    """
-    Returns Markdown help text for the %project magic command.
-
-    Returns:
-        str: Markdown-formatted help text.
-    """
-    text = """
+# Help text, built once at import
+_HELP_MD: Final[str] = """
 ### 📘 Available `%project` commands
 
 | Command                        | Parameters                        | Description                                                           |
@@ -29,42 +22,170 @@ def _help() -> str:
 | **`%project export`**         | *(no parameters)*                 | Exports the project to a file and saves it.                           |
 | **`%project help`** / **`?`** | *(no parameters)*                 | Shows this help.                                                      |
     """
-    return text
+_HELP_DISPLAY = Markdown(_HELP_MD)
+# Constant messages and templates, built once at import
+_MD_CLEARED = Markdown("`Code memory cleared.`")
+_MD_DELETED = Markdown("`Project deleted!`")
+_MD_CANCELLED = Markdown("`Project deletion cancelled...`")
+_MD_CONFIRM_DELETE = Markdown("**Do you really want to delete the entire project?**")
+_TPL_INIT_OK = "`Project *{}* successfully initialized in mode: {}.`"
+_TPL_LOAD_OK = "`Project *{}* loaded in mode: {}.`"
+_TPL_ALREADY_EXISTS = "**A project named `{0}` already exists. Choose another name or use `%project load {0}` to load the existing project.**"
+_TPL_DOES_NOT_EXIST = "**A project named `{0}` does not exist! Choose another name or use `%project init {0}` to create a new project.**"
+_UNKNOWN_TMPL = "**Unknown command:** `{}`\n\n" + _HELP_MD.replace("{", "{{").replace("}", "}}")  # braces escaped for str.format
+
+# Parser for [name] [--mode local|remote] [--remote_url <url>] [--token <token>], built once at import
+_NAME_MODE_P = argparse.ArgumentParser(prog="%project", add_help=False, allow_abbrev=False, exit_on_error=False)
+_NAME_MODE_P.add_argument("name", nargs="?", default=DEFAULT_PROJECT_NAME)
+_NAME_MODE_P.add_argument("--mode", type=str.lower, default=LOCAL_MODE)
+_NAME_MODE_P.add_argument("--remote_url")
+_NAME_MODE_P.add_argument("--token")
 
 def _parse_name_mode(args):
     """
     Parse [name] [--mode local|remote] [--remote_url <url>] [--token <token>] from args list.
 
+    Unknown arguments are ignored; an unsupported mode falls back to local.
+
     Args:
         args (list): List of arguments.
 
     Returns:
         tuple: (name, mode, remote_url, token) where name is the project name, mode is the project mode,
                remote_url is the URL for remote mode, and token is the authentication token.
+
+    Raises:
+        ValueError: If an option is missing its value.
+    """
+    try:
+        ns, _ = _NAME_MODE_P.parse_known_args(args)
+    except argparse.ArgumentError as e:
+        raise ValueError(str(e)) from None
+    mode = ns.mode if ns.mode in (LOCAL_MODE, REMOTE_MODE) else LOCAL_MODE
+    return ns.name, mode, ns.remote_url, ns.token
+
+# ----- Command handlers (rest = arguments after the command) -----
+def _cmd_help(rest: list[str]) -> None:
+    """Shows the help."""
+    display(_HELP_DISPLAY)
+
+def _cmd_init(rest: list[str]) -> None:
+    """Creates a new project."""
+    project_manager = lazy("project_manager")
+    name, mode, remote_url, token = _parse_name_mode(rest)
+    if project_manager.project_exists(name):
+        emit(_TPL_ALREADY_EXISTS, name)
+        return
+    project_manager.init_project(name, project_mode=mode, remote_url=remote_url, token=token)
+    emit(_TPL_INIT_OK, name, mode)
+
+def _cmd_load(rest: list[str]) -> None:
+    """Loads an existing project."""
+    project_manager = lazy("project_manager")
+    name, mode, remote_url, token = _parse_name_mode(rest)
+    if not project_manager.project_exists(name):
+        emit(_TPL_DOES_NOT_EXIST, name)
+        return
+    project_manager.load_project(name, project_mode=mode, remote_url=remote_url, token=token)
+    emit(_TPL_LOAD_OK, name, mode)
+
+def _cmd_clear(rest: list[str]) -> None:
+    """Clears code memory, a section or a single cell."""
+    section_name = rest[0] if len(rest) > 0 else None
+    cell_id = rest[1] if len(rest) > 1 else None
+    lazy("project_manager").clear(section=section_name, cell_id=cell_id)
+    display(_MD_CLEARED)
+
+def _cmd_status(rest: list[str]) -> None:
+    """Shows project info."""
+    emit(lazy("project_manager").status())
+
+def _finish_delete(confirmed: bool) -> None:
+    """Deletes the project if confirmed, otherwise reports the cancellation."""
+    if confirmed:
+        lazy("project_manager").delete_project()
+        display(_MD_DELETED)
+    else:
+        display(_MD_CANCELLED)
+
+def _cmd_delete(rest: list[str]) -> None:
     """
-    name = DEFAULT_PROJECT_NAME
-    mode = LOCAL_MODE
-    remote_url = None
-    token = None
-    i = 0
-    while i < len(args):
-        if args[i] == "--mode" and i + 1 < len(args):
-            mode = args[i + 1].lower()
-            i += 2
-        elif args[i] == "--remote_url" and i + 1 < len(args):
-            remote_url = args[i + 1]
-            i += 2
-        elif args[i] == "--token" and i + 1 < len(args):
-            token = args[i + 1]
-            i += 2
-        elif not args[i].startswith("--"):
-            name = args[i]
-            i += 1
-        else:
-            i += 1
-    if mode not in (LOCAL_MODE, REMOTE_MODE):
-        mode = LOCAL_MODE
-    return name, mode, remote_url, token
+    Deletes the project after user confirmation.
+
+    With ipywidgets available the confirmation is a Delete/Cancel button pair, so the
+    kernel is not blocked while waiting; otherwise it falls back to input().
+    """
+    try:
+        from ipywidgets import Button, HBox, Output, VBox
+    except ImportError:
+        user_affirmation = input("Do you really want to delete the entire project? (y/n): ").strip().lower()
+        _finish_delete(user_affirmation == 'y')
+        return
+
+    yes = Button(description="Delete", button_style="danger", icon="trash")
+    no = Button(description="Cancel")
+    out = Output()
+
+    def _on_click(confirmed: bool) -> None:
+        yes.disabled = no.disabled = True  # a single decision per prompt
+        with out:
+            try:
+                _finish_delete(confirmed)
+            except Exception as e:
+                emit_error(_ERROR_PREFIX["delete"], e)
+
+    yes.on_click(lambda _: _on_click(True))
+    no.on_click(lambda _: _on_click(False))
+    display(_MD_CONFIRM_DELETE, VBox([HBox([yes, no]), out]))
+
+# (project name, code, Markdown) of the last %project show
+_SHOW_CACHE: tuple | None = None
+
+def _cmd_show(rest: list[str]) -> None:
+    """
+    Shows the project code.
+
+    The code manager caches the generated sketch until the next change and returns the
+    same string object, so an identity check tells whether the last rendering is still valid.
+    """
+    global _SHOW_CACHE
+    project_manager = lazy("project_manager")
+    project_name = project_manager.project_name if project_manager.project_name else "No project set"
+    code = project_manager.show()
+    cached = _SHOW_CACHE
+    if cached is None or cached[1] is not code or cached[0] != project_name:
+        cached = _SHOW_CACHE = (project_name, code, Markdown(f"Project: **{project_name}**\n ```\n" + code + "\n```"))
+    display(cached[2])
+
+def _cmd_export(rest: list[str]) -> None:
+    """Exports and saves the project."""
+    file = lazy("project_manager").save()
+    emit("```\n Project exported and saved as:{}\n```", file)
+
+# Command name -> prefix of the error message shown when its handler raises
+_ERROR_PREFIX = {
+    "init": "Error initializing project",
+    "load": "Error loading project",
+    "clear": "Error clearing code",
+    "status": "Error getting project info",
+    "delete": "Error deleting project",
+    "show": "Error showing project code",
+    "export": "Error exporting project",
+}
+
+# Command name -> handler (exact match; handlers raise, ProjectMagics.project reports the error)
+_DISPATCH = {
+    "": _cmd_help,
+    "help": _cmd_help,
+    "?": _cmd_help,
+    "init": _cmd_init,
+    "load": _cmd_load,
+    "clear": _cmd_clear,
+    "status": _cmd_status,
+    "delete": _cmd_delete,
+    "show": _cmd_show,
+    "export": _cmd_export,
+}
 
 @magics_class
 class ProjectMagics(Magics):
@@ -90,85 +211,20 @@ class ProjectMagics(Magics):
             Does not raise; all exceptions are caught and displayed as Markdown.
         """
         try:
-            args = shlex.split(line)
+            args = split_magic_args(line)
         except Exception as e:
-            display(Markdown(f"**Error parsing arguments:** `{e}`"))
+            emit_error("Error parsing arguments", e)
             return
 
-        cmd = args[0].lower() if args else ""
-        rest = args[1:] if len(args) > 1 else []
-
+        cmd = command_token(args[0]) if args else ""
+        handler = _DISPATCH.get(cmd)
+        if handler is None:
+            emit(_UNKNOWN_TMPL, cmd)
+            return
         try:
-            if cmd.startswith("init"):
-                # Create a new project
-                name, mode, remote_url, token = _parse_name_mode(rest)
-                if project_manager.project_exists(name):
-                    display(Markdown(f"**A project named `{name}` already exists. Choose another name or use `%project load {name}` to load the existing project.**"))
-                    return
-                try:
-                    project_manager.init_project(name, project_mode=mode, remote_url=remote_url, token=token)
-                    display(Markdown(f"`Project *{name}* successfully initialized in mode: {mode}.`"))
-                except Exception as e:
-                    display(Markdown(f"**Error initializing project:** `{e}`"))
-            elif cmd.startswith("load"):
-                # Load an existing project
-                name, mode, remote_url, token = _parse_name_mode(rest)
-                if not project_manager.project_exists(name):
-                    display(Markdown(f"**A project named `{name}` does not exist! Choose another name or use `%project init {name}` to create a new project.**"))
-                    return
-                try:
-                    project_manager.load_project(name, project_mode=mode, remote_url=remote_url, token=token)
-                    display(Markdown(f"`Project *{name}* loaded in mode: {mode}.`"))
-                except Exception as e:
-                    display(Markdown(f"**Error loading project:** `{e}`"))
-            elif cmd.startswith("clear"):
-                # Clear code memory or section/cell
-                section_name = rest[0] if len(rest) > 0 else None
-                cell_id = rest[1] if len(rest) > 1 else None
-                try:
-                    project_manager.clear(section=section_name, cell_id=cell_id)
-                    display(Markdown("`Code memory cleared.`"))
-                except Exception as e:
-                    display(Markdown(f"**Error clearing code:** `{e}`"))
-            elif cmd == "status":
-                # Show project info
-                try:
-                    status = project_manager.status()
-                    display(Markdown(status))
-                except Exception as e:
-                    display(Markdown(f"**Error getting project info:** `{e}`"))
-            elif cmd == "delete":
-                # Delete the project after user confirmation
-                try:
-                    user_affirmation = input("Do you really want to delete the entire project? (y/n): ").strip().lower()
-                    if user_affirmation == 'y':
-                        project_manager.delete_project()
-                        display(Markdown("`Project deleted!`"))
-                    else:
-                        display(Markdown("`Project deletion cancelled...`"))
-                except Exception as e:
-                    display(Markdown(f"**Error deleting project:** `{e}`"))
-            elif cmd == "show":
-                # Show project code
-                try:
-                    project_name = project_manager.project_name if project_manager.project_name else "No project set"
-                    code = project_manager.show()
-                    display(Markdown(f"Project: **{project_name}**\n ```\n" + code + "\n```"))
-                except Exception as e:
-                    display(Markdown(f"**Error showing project code:** `{e}`"))
-            elif cmd == "export":
-                # Export and save project
-                try:
-                    file = project_manager.save()
-                    display(Markdown("```\n Project exported and saved as:" + file + "\n```"))
-                except Exception as e:
-                    display(Markdown(f"**Error exporting project:** `{e}`"))
-            elif cmd == "help" or cmd == "?":
-                display(Markdown(_help()))
-            else:
-                display(Markdown(f"**Unknown command:** `{cmd}`\n\n" + _help()))
+            handler(args[1:])
         except Exception as e:
-            display(Markdown(f"**Error:** `{e}`"))
+            emit_error(_ERROR_PREFIX.get(cmd, "Error"), e)
 
 def load_ipython_extension(ipython):
     """
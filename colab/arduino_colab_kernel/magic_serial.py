@@ -1,37 +1,59 @@
 # magic_serial.py
 # Magic cell %%serial for working with the serial port.
 
-import shlex
+import atexit
+import sys
+from typing import Final, NamedTuple, Optional
 from IPython.core.magic import Magics, magics_class, line_magic
 from IPython.display import Markdown, display
-from arduino_colab_kernel.bridge.bridge import bridge_manager  # Use bridge_manager instead of direct board access
-from arduino_colab_kernel.board.board_manager import board_manager
-
-def _help() -> str:
-    """
-    Returns help text for the %%serial magic command.
-
-    Returns:
-        str: Markdown-formatted help text.
-    """
-    return (
-        "**Usage:** `%%serial [listen|read|write|help] [options]`\n\n"
-        "**Commands:**\n"
-        "- `listen` – reads serial output continuously for `--duration` or until interrupted (Ctrl+C)\n"
-        "- `read` – reads the specified number of lines (`--lines`)\n"
-        "- `write` – writes data to the serial port (`--data` or cell content)\n"
-        "- `help` – shows this help\n\n"
-        "**Common requirements:**\n"
-        "- Board must be set (`%board set`) and serial port (`%board serial` or autodetect)\n\n"
-        "**Options for `listen`:**\n"
-        "- `--duration <seconds>` – listening duration; if not set, runs until Ctrl+C\n"
-        "- `--prefix <text>` – filters lines starting with the given prefix\n\n"
-        "**Options for `read`:**\n"
-        "- `--lines <count>` – number of lines to read (default 1)\n\n"
-        "**Options for `write`:**\n"
-        "- `--data <text>` – text to send; if not set, uses cell content\n"
-        "- `--no-nl` – do not send newline (`\\n`) at the end of the message\n"
-    )
+from arduino_colab_kernel.utils.utils_magic import command_token, emit, emit_error, lazy, split_magic_args
+
+# Help text, built once at import
+_HELP_MD: Final[str] = (
+    "**Usage:** `%%serial [listen|read|write|close|help] [options]`\n\n"
+    "**Commands:**\n"
+    "- `listen` – reads serial output continuously for `--duration` or until interrupted (Ctrl+C)\n"
+    "- `read` – reads the specified number of lines (`--lines`)\n"
+    "- `write` – writes data to the serial port (`--data` or cell content)\n"
+    "- `close` – closes the serial port (it otherwise stays open between cells)\n"
+    "- `help` – shows this help\n\n"
+    "**Common requirements:**\n"
+    "- Board must be set (`%board set`) and serial port (`%board serial` or autodetect)\n\n"
+    "**Options for `listen`:**\n"
+    "- `--duration <seconds>` – listening duration; if not set, runs until Ctrl+C\n"
+    "- `--prefix <text>` – filters lines starting with the given prefix\n\n"
+    "**Options for `read`:**\n"
+    "- `--lines <count>` – number of lines to read (default 1)\n"
+    "- `--timeout <seconds>` – stop waiting after this time, even if fewer lines arrived\n\n"
+    "**Options for `write`:**\n"
+    "- `--data <text>` – text to send; if not set, uses cell content\n"
+    "- `--no-nl` – do not send newline (`\\n`) at the end of the message\n"
+)
+_HELP_DISPLAY = Markdown(_HELP_MD)
+_UNKNOWN_DISPLAY = Markdown("**Unknown command.**\n\n" + _HELP_MD)
+_LISTEN_END = Markdown("✅ **Listening ended.**")
+_CLOSED = Markdown("🔌 **Serial port closed.**")
+
+class _SerialOpts(NamedTuple):
+    """Parsed %%serial options (see _HELP_MD)."""
+    duration: Optional[float] = None
+    prefix: Optional[str] = None
+    lines: int = 1
+    timeout: Optional[float] = None
+    data: Optional[str] = None
+    no_nl: bool = False
+
+_DEFAULT_OPTS = _SerialOpts()
+
+# Flag -> (converter, _SerialOpts field); converter None = switch without a value
+_FLAGS = {
+    "--duration": (float, "duration"),
+    "--prefix": (str, "prefix"),
+    "--lines": (int, "lines"),
+    "--timeout": (float, "timeout"),
+    "--data": (str, "data"),
+    "--no-nl": (None, "no_nl"),
+}
 
 def _parse_serial_args(line: str):
     """
@@ -41,36 +63,78 @@ def _parse_serial_args(line: str):
         line (str): The command line after %%serial.
 
     Returns:
-        tuple: (cmd, opts) where cmd is the command string and opts is a dictionary of options.
+        tuple: (cmd, opts) where cmd is the command string and opts is a _SerialOpts.
+
+    Raises:
+        ValueError: If a flag value is missing or has the wrong type.
     """
-    args = shlex.split(line)
+    args = split_magic_args(line)
     if not args:
-        return "", {}
-    cmd = args[0].lower()
-    opts = {
-        "duration": None,
-        "prefix": None,
-        "lines": 1,
-        "data": None,
-        "no_nl": False
-    }
-    i = 1
-    while i < len(args):
+        return "", _DEFAULT_OPTS
+    cmd = command_token(args[0])
+    values = {}
+    i, n = 1, len(args)
+    while i < n:
         a = args[i]
-        if a == "--duration":
-            i += 1; opts["duration"] = float(args[i])
-        elif a == "--prefix":
-            i += 1; opts["prefix"] = args[i]
-        elif a == "--lines":
-            i += 1; opts["lines"] = int(args[i])
-        elif a == "--data":
-            i += 1; opts["data"] = args[i]
-        elif a == "--no-nl":
-            opts["no_nl"] = True
+        spec = _FLAGS.get(a)
+        if spec is None:
+            emit("**Unknown argument:** `{}`", a)
         else:
-            display(Markdown(f"**Unknown argument:** `{a}`"))
+            conv, field = spec
+            if conv is None:
+                values[field] = True
+            else:
+                i += 1
+                if i >= n:
+                    raise ValueError(f"Missing value for `{a}`")
+                values[field] = conv(args[i])
         i += 1
-    return cmd, opts
+    return cmd, (_SerialOpts(**values) if values else _DEFAULT_OPTS)
+
+
+# ----- Command handlers (bridge = bridge_manager, b = selected board) -----
+def _cmd_listen(bridge, b, opts: _SerialOpts, cell) -> None:
+    """Reads serial output for --duration seconds or until interrupted."""
+    duration, prefix = opts.duration, opts.prefix
+    emit(
+        "📡 **Listening**, duration: {}{}",
+        f"{duration}s" if duration else "unlimited",
+        f", filter prefix: `{prefix}`" if prefix else "",
+    )
+    try:
+        bridge.listen_serial(b, duration=duration, prefix=prefix)
+    except Exception as e:
+        emit_error("Error during listening", e)
+    display(_LISTEN_END)
+
+def _cmd_read(bridge, b, opts: _SerialOpts, cell) -> None:
+    """Reads --lines lines (bounded by --timeout)."""
+    lines = max(1, opts.lines)
+    try:
+        received = bridge.readlines_serial(b, size=lines, deadline=opts.timeout)
+        if received:
+            # One stream write (one IOPub message) for the whole batch
+            sys.stdout.write("\n".join(received) + "\n")
+    except Exception as e:
+        emit_error("Error during read", e)
+
+def _cmd_write(bridge, b, opts: _SerialOpts, cell) -> None:
+    """Writes --data (or the cell content) to the port."""
+    data = opts.data
+    payload = data if data is not None else (cell or "")
+    try:
+        bridge.write_serial(b, payload, append_newline=not opts.no_nl)
+        emit("✉️ **Sent:** `{}`", payload.strip())
+    except Exception as e:
+        emit_error("Error during write", e)
+
+# Command name -> handler (the port is opened before the handler and stays open for
+# later cells; see `%serial close`)
+_DISPATCH = {
+    "listen": _cmd_listen,
+    "read": _cmd_read,
+    "write": _cmd_write,
+}
 
 
 @magics_class
@@ -97,60 +161,44 @@ class SerialMagic(Magics):
         Raises:
             Does not raise; all exceptions are caught and displayed as Markdown.
         """
-        cmd, opts = _parse_serial_args(line)
+        try:
+            cmd, opts = _parse_serial_args(line)
+        except ValueError as e:
+            emit_error("Error parsing arguments", e)
+            return
 
         if cmd == "help" or cmd == "":
-            display(Markdown(_help()))
+            display(_HELP_DISPLAY)
+            return
+        if cmd == "close":
+            lazy("bridge_manager").release_serial()
+            display(_CLOSED)
             return
 
-        if cmd not in ("listen", "read", "write"):
-            display(Markdown("**Unknown command.**\n\n" + _help()))
+        handler = _DISPATCH.get(cmd)
+        if handler is None:
+            display(_UNKNOWN_DISPLAY)
             return
 
+        # Imported on first use; bridge_manager is used instead of direct board access.
+        # The port is left open for the next cell (reopening resets many boards and costs
+        # a device open); the bridge closes it before uploads or when the board changes.
+        bridge_manager = lazy("bridge_manager")
         try:
-            b = board_manager.require_board()
+            b = lazy("board_manager").require_board()
             bridge_manager.open_serial(b)
-
-            if cmd == "listen":
-                duration = opts["duration"]
-                prefix = opts["prefix"]
-                display(Markdown(
-                    f"📡 **Listening**"
-                    + (f", duration: {duration}s" if duration else ", duration: unlimited")
-                    + (f", filter prefix: `{prefix}`" if prefix else "")
-                ))
-                try:
-                    b = board_manager.require_board()
-                    bridge_manager.listen_serial(b, duration=duration, prefix=prefix)
-                except Exception as e:
-                    display(Markdown(f"**Error during listening:** `{e}`"))
-                display(Markdown("✅ **Listening ended.**"))
-
-            elif cmd == "read":
-                lines = max(1, opts["lines"])
-                try:
-                    for ln in bridge_manager.readlines_serial(b, size=lines):
-                        print(ln)
-                except Exception as e:
-                    display(Markdown(f"**Error during read:** `{e}`"))
-
-            elif cmd == "write":
-                payload = opts["data"] if opts["data"] is not None else (cell or "")
-                try:
-                    bridge_manager.write_serial(b, payload, append_newline=not opts["no_nl"])
-                    display(Markdown(f"✉️ **Sent:** `{payload.strip()}`"))
-                except Exception as e:
-                    display(Markdown(f"**Error during write:** `{e}`"))
-
+            handler(bridge_manager, b, opts, cell)
         except Exception as e:
-            display(Markdown(f"**Error:** `{e}`"))
-        finally:
-            try:
-                b = board_manager.require_board()
-                bridge_manager.close_serial(b)
-            except Exception:
-                pass
+            emit_error("Error", e)
+
 
+def _release_at_exit() -> None:
+    """Closes a serial port left open between cells when the kernel shuts down."""
+    bridge_mod = sys.modules.get("arduino_colab_kernel.bridge.bridge")
+    # Never opened anything if the bridge was not imported or its lazy manager never
+    # created; reading the attribute would build a new Bridge during shutdown
+    if bridge_mod is not None and "bridge_manager" in vars(bridge_mod):
+        bridge_mod.bridge_manager.release_serial()
 
 def load_ipython_extension(ipython):
     """
@@ -163,3 +211,5 @@ def load_ipython_extension(ipython):
         None
     """
     ipython.register_magics(SerialMagic)
+    atexit.unregister(_release_at_exit)  # reloading the extension must not register it twice
+    atexit.register(_release_at_exit)
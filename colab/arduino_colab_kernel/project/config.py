@@ -16,6 +16,12 @@ DEFAULT_PROJECT_NAME = "sketch"
 DEFAULT_PROJECTS_DIR = "./projects"
 DEFAULT_LOGS_DIR = "logs"
 
+# Persistent arduino-cli build cache (shared core cache + per-sketch build dirs)
+_USER_CACHE_ROOT = (
+    os.environ.get("LOCALAPPDATA") if os.name == "nt" else os.environ.get("XDG_CACHE_HOME")
+) or os.path.join(os.path.expanduser("~"), ".cache")
+DEFAULT_BUILD_CACHE_DIR = os.path.join(_USER_CACHE_ROOT, "arduino_colab_kernel", "build_cache")
+
 DEFAULT_SERIAL_CONFIG = {
     "baudrate": 115200,
     "timeout": 0.1,
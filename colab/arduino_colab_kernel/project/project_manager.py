@@ -4,14 +4,23 @@
 from typing import List, Dict, Optional
 import os
 import json
+import shutil
+import hashlib
+
+try:
+    import orjson  # optional, much faster JSON (pip install orjson)
+except ImportError:
+    orjson = None
 
 from arduino_colab_kernel.board.board_manager import board_manager  # global instance BoardManager
-from arduino_colab_kernel.code.code_manager import code_manager  # global instance ArduinoCodeManager
-from arduino_colab_kernel.bridge.bridge import bridge_manager  # global instance Bridge
-from arduino_colab_kernel.bridge.bridge import LOCAL_MODE, REMOTE_MODE
+# Modules, not their singletons: code_manager and bridge_manager are created lazily (PEP 562)
+# on first attribute access, so importing this module does not build them
+import arduino_colab_kernel.code.code_manager as _code  # _code.code_manager: global ArduinoCodeManager
+import arduino_colab_kernel.bridge.bridge as _bridge  # _bridge.bridge_manager: global Bridge
 
 from arduino_colab_kernel.code.ino_generator import InoGenerator
 from arduino_colab_kernel.project.config import (
+    LOCAL_MODE,
     DEFAULT_PROJECT_NAME,
     DEFAULT_PROJECTS_DIR,
     DEFAULT_LOGS_DIR
@@ -35,6 +44,10 @@ class ArduinoProjectManager:
         self.project_name = ""
         self.project_dir = ""
         self.logs_dir = ""
+        # Absolute forms, resolved once in _set_project_dir (None = not set yet)
+        self._project_dir_abs: Optional[str] = None
+        self._logs_dir_abs: Optional[str] = None
+        self._json_digest: Optional[bytes] = None  # digest of the last saved project JSON
         self.project_mode = ""
         self.project_remote_url = ""
         self.ino_generator: InoGenerator = InoGenerator(prepare_dirs=False)
@@ -77,15 +90,15 @@ class ArduinoProjectManager:
         """
         self.project_name = project_name.strip()
         try:
-            bridge_manager.set_mode(project_mode, remote_url=remote_url, token=token)
-            self.project_mode = bridge_manager.mode
-            self.project_remote_url = bridge_manager.remote_url
+            _bridge.bridge_manager.set_mode(project_mode, remote_url=remote_url, token=token)
+            self.project_mode = _bridge.bridge_manager.mode
+            self.project_remote_url = _bridge.bridge_manager.remote_url
             
             self._set_project_dir(projects_dir)
             projects_dir_abs = self.get_project_dir(as_abs=True)
             self.ino_generator = InoGenerator(self.project_name, projects_dir_abs)
             board_manager.default()  # Select default board
-            code_manager.default()   # Re-initialize code manager
+            _code.code_manager.default()   # Re-initialize code manager
             self.save()  # Save project
         except Exception as e:
             raise RuntimeError(f"Failed to initialize project: {e}")
@@ -115,9 +128,9 @@ class ArduinoProjectManager:
         """
         self.project_name = project_name.strip()
         try:
-            bridge_manager.set_mode(project_mode, remote_url=remote_url, token=token)
-            self.project_mode = bridge_manager.mode
-            self.project_remote_url = bridge_manager.remote_url
+            _bridge.bridge_manager.set_mode(project_mode, remote_url=remote_url, token=token)
+            self.project_mode = _bridge.bridge_manager.mode
+            self.project_remote_url = _bridge.bridge_manager.remote_url
             
             self._set_project_dir(projects_dir)
             projects_dir_abs = self.get_project_dir(as_abs=True)
@@ -125,9 +138,9 @@ class ArduinoProjectManager:
             json_file = os.path.join(projects_dir_abs, f"{self.project_name}.json")
             if not os.path.exists(json_file):
                 raise FileNotFoundError(f"Project {self.project_name} does not contain any JSON project file.")
-            with open(json_file, "r", encoding="utf-8") as f:
-                json_data = json.load(f)
-                self._configure(**json_data)
+            with open(json_file, "rb") as f:
+                json_data = _json_loads(f.read())
+            self._configure(**json_data)
         except Exception as e:
             raise RuntimeError(f"Failed to load project: {e}")
         
@@ -148,17 +161,13 @@ class ArduinoProjectManager:
         Raises:
             Exception: If file or directory operations fail.
         """
-        code_manager.clear()
+        _code.code_manager.clear()
+        _bridge.bridge_manager.close_logs()  # release open log files inside the project
         sketch_dir = self.get_project_dir(as_abs=False)
         if os.path.exists(sketch_dir):
             try:
                 # Recurse delete of the sketch directory and all its contents
-                for root, dirs, files in os.walk(sketch_dir, topdown=False):
-                    for name in files:
-                        os.remove(os.path.join(root, name))
-                    for name in dirs:
-                        os.rmdir(os.path.join(root, name))
-                os.rmdir(sketch_dir)
+                shutil.rmtree(sketch_dir)
             except Exception as e:
                 raise RuntimeError(f"Failed to delete project directory '{sketch_dir}': {e}")
     
@@ -183,9 +192,9 @@ class ArduinoProjectManager:
                 
             if "code" in kwargs:
                 code_data: dict = kwargs["code"]
-                code_manager.import_from_json(code_data)
+                _code.code_manager.import_from_json(code_data)
             else:
-                code_manager.default()
+                _code.code_manager.default()
         except Exception as e:
             raise RuntimeError(f"Failed to configure project: {e}")
             
@@ -202,9 +211,9 @@ class ArduinoProjectManager:
         """
         try:
             if section:
-                code_manager.remove_code(section, cell_id)
+                _code.code_manager.remove_code(section, cell_id)
             else:
-                code_manager.clear()
+                _code.code_manager.clear()
         except Exception as e:
             raise RuntimeError(f"Failed to clear project code: {e}")
         
@@ -215,7 +224,7 @@ class ArduinoProjectManager:
         Returns:
             str: The current Arduino code as text.
         """
-        return code_manager.export_as_code()
+        return _code.code_manager.export_as_code()
     
     def export(self) -> dict:
         """
@@ -229,29 +238,36 @@ class ArduinoProjectManager:
             "project_dir": self.get_project_dir(as_abs=True),
             "ino_file": self.ino_generator.get_path(),
             "board": board_manager.export(),
-            "code": code_manager.export_as_json()
+            "code": _code.code_manager.export_as_json()
         }
     
     def save(self) -> str:
         """
         Saves the current code to a .ino file in the target directory and exports project JSON.
 
+        The code is generated once per call, and the JSON file is only rewritten when its
+        content differs from the last save (or the file has gone missing).
+
         Returns:
             str: Absolute path to the project directory.
 
         Raises:
             Exception: If saving code or project fails.
         """
-        code = code_manager.export_as_code()
+        code = _code.code_manager.export_as_code()
         try:
             self.ino_generator.export(code)
             # Export project
             project_json = self.export()
             projects_dir_abs = self.get_project_dir(as_abs=True)
             json_file = os.path.join(projects_dir_abs, f"{self.project_name}.json")
-            with open(json_file, "w", encoding="utf-8") as f:
-                json.dump(project_json, f, indent=4, ensure_ascii=False)
+            payload = _json_dumps(project_json)
+            digest = hashlib.blake2b(payload, digest_size=16).digest()
+            if digest != self._json_digest or not os.path.isfile(json_file):
+                _write_atomic(json_file, payload)
+                self._json_digest = digest
         except Exception as e:
+            self._json_digest = None
             raise RuntimeError(f"Failed to save project: {e}")
         return self.get_project_dir(as_abs=True)       
     
@@ -267,11 +283,14 @@ class ArduinoProjectManager:
         """
         self.project_dir = os.path.join(projects_dir, self.project_name)
         self.logs_dir = os.path.join(self.project_dir, DEFAULT_LOGS_DIR)
+        self._project_dir_abs = os.path.abspath(self.project_dir)
+        self._logs_dir_abs = os.path.join(self._project_dir_abs, DEFAULT_LOGS_DIR)
+        self._json_digest = None  # new target file, next save() must write it
         try:
-            projects_dir_abs = self.get_project_dir(as_abs=True)
-            os.makedirs(projects_dir_abs, exist_ok=True)
-            logs_dir_abs = self.get_logs_dir(as_abs=True)
-            os.makedirs(logs_dir_abs, exist_ok=True)
+            # makedirs of the logs dir also creates the project dir; a stat is cheaper
+            # than a failing mkdir when switching to an existing project
+            if not os.path.isdir(self._logs_dir_abs):
+                os.makedirs(self._logs_dir_abs, exist_ok=True)
         except Exception as e:
             raise RuntimeError(f"Failed to create project or logs directory: {e}")
     
@@ -285,7 +304,9 @@ class ArduinoProjectManager:
         Returns:
             str: Path to the project directory.
         """
-        return os.path.abspath(self.project_dir) if as_abs else os.path.relpath(self.project_dir)
+        if as_abs:
+            return self._project_dir_abs or os.path.abspath(self.project_dir)
+        return os.path.relpath(self.project_dir)
     
     def get_logs_dir(self, as_abs: bool = False) -> str:
         """
@@ -297,7 +318,59 @@ class ArduinoProjectManager:
         Returns:
             str: Path to the logs directory.
         """
-        return os.path.abspath(self.logs_dir) if as_abs else os.path.relpath(self.logs_dir)
+        if as_abs:
+            return self._logs_dir_abs or os.path.abspath(self.logs_dir)
+        return os.path.relpath(self.logs_dir)
     
+# ----- JSON helpers -----
+def _json_dumps(data: dict) -> bytes:
+    """
+    Serializes project data to indented UTF-8 JSON (orjson when installed).
+
+    Args:
+        data (dict): Project data.
+
+    Returns:
+        bytes: Encoded JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+def _json_loads(raw: bytes) -> dict:
+    """
+    Parses a project JSON file content (orjson when installed).
+
+    Args:
+        raw (bytes): File content.
+
+    Returns:
+        dict: Project data.
+    """
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """
+    Writes a file via a temporary file and os.replace(), so a crash never leaves it truncated.
+
+    Args:
+        path (str): Target file path.
+        data (bytes): Content to write.
+
+    Raises:
+        OSError: If writing or replacing fails (the temporary file is removed).
+    """
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
 # Singleton for magics
 project_manager = ArduinoProjectManager()
\ No newline at end of file
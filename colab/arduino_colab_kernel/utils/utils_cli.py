@@ -4,24 +4,13 @@
 
 from __future__ import annotations
 import os
-import sys
 import stat
+import hashlib
 import shutil
 import tempfile
+from functools import lru_cache
 from pathlib import Path
 
-# Py 3.9+: importlib.resources.files/as_file; for Py 3.8 you can use the backport 'importlib_resources'
-try:
-    from importlib.resources import files, as_file
-except Exception:  # Py <3.9 fallback, if needed
-    from importlib_resources import files, as_file  # type: ignore
-
-# NOTE: 'tools' is a package in your bundle where the binaries are located
-try:
-    from arduino_colab_kernel import tools  # folder with arduino-cli in the package
-except Exception:
-    tools = None  # fallback if tools is not part of the package
-
 
 def _is_windows() -> bool:
     """
@@ -53,6 +42,48 @@ def _ensure_executable(path: Path) -> None:
         pass
 
 
+def _same_file(src: Path, dst: Path) -> bool:
+    """
+    Checks whether dst is an identical copy of src.
+
+    Size and mtime (kept by shutil.copy2) decide quickly; if only the size matches
+    (e.g. the resource was freshly extracted from a zip), the contents are hashed.
+
+    Args:
+        src (Path): Original file.
+        dst (Path): Possible earlier copy.
+
+    Returns:
+        bool: True if dst exists and has the same content as src.
+    """
+    try:
+        s, d = src.stat(), dst.stat()
+        if s.st_size != d.st_size:
+            return False
+        if s.st_mtime_ns == d.st_mtime_ns:
+            return True
+        return _file_digest(src) == _file_digest(dst)
+    except OSError:
+        return False
+
+
+def _file_digest(path: Path) -> bytes:
+    """
+    Returns the blake2b digest of a file's content.
+
+    Args:
+        path (Path): File to hash.
+
+    Returns:
+        bytes: Digest of the content.
+    """
+    h = hashlib.blake2b()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.digest()
+
+
 def _copy_to_temp(resource_path: Path, target_name: str | None = None) -> Path:
     """
     Copies the resource to a temp directory and returns its Path (persistent for the session).
@@ -70,8 +101,11 @@ def _copy_to_temp(resource_path: Path, target_name: str | None = None) -> Path:
     temp_dir = Path(tempfile.gettempdir()) / "arduino_colab_kernel"
     temp_dir.mkdir(parents=True, exist_ok=True)
     dst = temp_dir / (target_name or resource_path.name)
+    # already extracted earlier (same binary) -> reuse it instead of copying again
+    if _same_file(resource_path, dst):
+        _ensure_executable(dst)
+        return dst
     try:
-        # if it already exists, you could compare size/mtime, but just overwrite
         shutil.copy2(str(resource_path), str(dst))
     except Exception:
         # fallback without metadata
@@ -92,8 +126,31 @@ def resolve_arduino_cli_path(explicit_path: str | None = None) -> str:
        - if it's directly on the FS, returns that
        - if it's in a zip, extracts to temp and returns the new path
 
+    The result is cached per (explicit path, ARDUINO_CLI, PATH) value, so repeated calls
+    do not scan PATH or the package resources again, while changes to the environment
+    (e.g. installing arduino-cli from a notebook cell) are still picked up.
+
+    Args:
+        explicit_path (str|None): Explicit path to arduino-cli, or None.
+
+    Returns:
+        str: Path to the arduino-cli executable.
+
+    Raises:
+        FileNotFoundError: If arduino-cli cannot be found by any method.
+    """
+    return _resolve_cached(explicit_path, os.environ.get("ARDUINO_CLI"), os.environ.get("PATH"))
+
+
+@lru_cache(maxsize=4)
+def _resolve_cached(explicit_path: str | None, env_path: str | None, search_path: str | None) -> str:
+    """
+    Cached implementation of resolve_arduino_cli_path().
+
     Args:
         explicit_path (str|None): Explicit path to arduino-cli, or None.
+        env_path (str|None): Value of the ARDUINO_CLI environment variable, or None.
+        search_path (str|None): Value of PATH searched for the executable, or None.
 
     Returns:
         str: Path to the arduino-cli executable.
@@ -102,7 +159,7 @@ def resolve_arduino_cli_path(explicit_path: str | None = None) -> str:
         FileNotFoundError: If arduino-cli cannot be found by any method.
     """
     # 1) explicit / env
-    candidate = explicit_path or os.environ.get("ARDUINO_CLI")
+    candidate = explicit_path or env_path
     if candidate:
         p = Path(candidate)
         if p.is_file():
@@ -110,12 +167,22 @@ def resolve_arduino_cli_path(explicit_path: str | None = None) -> str:
 
     # 2) PATH
     exe_name = "arduino-cli.exe" if _is_windows() else "arduino-cli"
-    found = shutil.which(exe_name)
+    found = shutil.which(exe_name, path=search_path)
     if found:
         return found
 
-    # 3) resource in the package
+    # 3) resource in the package (imported only here, PATH/env usually resolve first)
+    # NOTE: 'tools' is a package in your bundle where the binaries are located
+    try:
+        from arduino_colab_kernel import tools  # folder with arduino-cli in the package
+    except ImportError:
+        tools = None  # fallback if tools is not part of the package
     if tools is not None:
+        # Py 3.9+: importlib.resources.files/as_file; for Py 3.8 you can use the backport 'importlib_resources'
+        try:
+            from importlib.resources import files, as_file
+        except ImportError:  # Py <3.9 fallback, if needed
+            from importlib_resources import files, as_file  # type: ignore
         try:
             resource = files(tools).joinpath(exe_name)
             # as_file ensures a real path even if the resource is in a zip
@@ -129,7 +196,7 @@ def resolve_arduino_cli_path(explicit_path: str | None = None) -> str:
                 # otherwise manually copy to temp (theoretically as_file already handles this)
                 extracted = _copy_to_temp(real_path, exe_name)
                 return str(extracted)
-        except Exception as e:
+        except Exception:
             # last attempt: if files() fails, nothing is found
             pass
 
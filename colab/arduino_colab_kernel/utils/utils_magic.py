@@ -0,0 +1,137 @@
+# utils_magic.py
+# Helpers shared by the IPython magics.
+
+from __future__ import annotations
+import functools
+import importlib
+import sys
+from IPython import get_ipython
+from IPython.display import Markdown, display
+
+
+def split_magic_args(line: str | None) -> list[str]:
+    """
+    Splits a magic command line into arguments.
+
+    Lines without quotes or backslashes (the usual `%board status`, `%%code loop`)
+    are split with str.split(); only lines that need it go through (memoized) shlex.
+
+    Args:
+        line (str|None): The command line after the magic name.
+
+    Returns:
+        list[str]: List of arguments (empty for an empty line).
+
+    Raises:
+        ValueError: If quoting is unbalanced (from shlex).
+    """
+    if not line:
+        return []
+    if "'" in line or '"' in line or "\\" in line:
+        return list(_shlex_split_cached(line))
+    return line.split()
+
+
+def command_token(arg: str) -> str:
+    """
+    Normalizes a command/section word (lower case, interned).
+
+    Dispatch keys are string literals, which the compiler already interns, so
+    lookups with an interned token hit on identity instead of comparing characters.
+
+    Args:
+        arg (str): Raw command word.
+
+    Returns:
+        str: Interned lower-case word.
+    """
+    return sys.intern(arg.lower())
+
+
+@functools.lru_cache(maxsize=64)
+def _shlex_split_cached(line: str) -> tuple[str, ...]:
+    """
+    Memoized shlex.split() for quoted lines (re-running the same cell repeats the same line).
+
+    Args:
+        line (str): The command line.
+
+    Returns:
+        tuple[str, ...]: Arguments (a tuple, so cached results cannot be mutated by callers).
+    """
+    import shlex  # only needed for quoted lines
+    return tuple(shlex.split(line))
+
+
+
+# ----- Output -----
+def _display_enabled() -> bool:
+    """
+    Checks whether there is an IPython shell with a display publisher to send output to.
+
+    Returns:
+        bool: False outside IPython (e.g. plain scripts), where rich output is dropped anyway.
+    """
+    shell = get_ipython()
+    return shell is not None and getattr(shell, "display_pub", None) is not None
+
+
+def emit(template: str, *args) -> None:
+    """
+    Displays a Markdown message; the template is only formatted when it will be shown.
+
+    Args:
+        template (str): Markdown text, with str.format() fields if args are given.
+        *args: Values for the template fields.
+    """
+    if not _display_enabled():
+        return
+    display(Markdown(template.format(*args) if args else template))
+
+
+def emit_error(prefix: str, exc: BaseException) -> None:
+    """
+    Displays an error message "**<prefix>:** `<exc>`" (str(exc) is only taken when shown).
+
+    Args:
+        prefix (str): Context of the error (e.g. "Error saving code").
+        exc (BaseException): The exception to report.
+    """
+    emit("**{}:** `{}`", prefix, exc)
+
+# ----- Lazy singletons -----
+# Name -> (module, attribute); imported on first use so that %load_ext does not
+# pull in the board/bridge/arduino-cli stack (and pyserial's port backends).
+_LAZY_TARGETS: dict[str, tuple[str, str]] = {
+    "board_manager": ("arduino_colab_kernel.board.board_manager", "board_manager"),
+    "project_manager": ("arduino_colab_kernel.project.project_manager", "project_manager"),
+    "bridge_manager": ("arduino_colab_kernel.bridge.bridge", "bridge_manager"),
+    "code_manager": ("arduino_colab_kernel.code.code_manager", "code_manager"),
+    "ALLOWED_SECTIONS": ("arduino_colab_kernel.code.code_manager", "ALLOWED_SECTIONS"),
+    "SerialPort": ("arduino_colab_kernel.bridge.serial_port", "SerialPort"),
+    "list_serial_ports": ("arduino_colab_kernel.bridge.serial_port", "list_serial_ports"),
+}
+_lazy: dict = {}
+
+
+def lazy(name: str):
+    """
+    Returns a heavy module-level object, importing its module on first use.
+
+    Args:
+        name (str): Key from _LAZY_TARGETS (e.g. "board_manager").
+
+    Returns:
+        Any: The imported object (memoized).
+
+    Raises:
+        KeyError: If the name is not registered.
+        ImportError: If the module cannot be imported.
+    """
+    try:
+        return _lazy[name]
+    except KeyError:
+        pass
+    module, attr = _LAZY_TARGETS[name]
+    obj = _lazy[name] = getattr(importlib.import_module(module), attr)
+    return obj